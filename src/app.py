@@ -0,0 +1,232 @@
+"""
+アプリケーション本体（トレイアイコン、ホットキー、付箋管理）。
+起動は main.py から行います。
+"""
+import tkinter as tk
+import threading
+from pynput import keyboard
+from capture_tool import CaptureTool
+from snippet_window import SnippetManager
+from history import CaptureHistory, HistoryBrowser
+from pipeline import CapturePipeline
+import ipc
+import pystray
+from PIL import Image, ImageDraw
+
+class TrayIcon:
+    """
+    pystrayを使用してシステムトレイアイコンを管理します。
+    Tkinterのメインループをブロックしないよう、別スレッドで実行されます。
+    """
+    def __init__(self, app):
+        """
+        Args:
+            app: メインのSetunaCloneAppインスタンス。
+        """
+        self.app = app
+        self.icon = None
+        self.thread = None
+
+    def create_image(self):
+        """アイコン画像を生成または読み込みます。"""
+        try:
+             # assets/favicon.icoを読み込む
+            import os
+            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            favicon_path = os.path.join(base_dir, "assets", "favicon.ico")
+            return Image.open(favicon_path)
+        except Exception as e:
+            print(f"Failed to load favicon.ico: {e}. Using default icon.")
+            # シンプルなアイコンを作成（例：青い四角に白い窓）
+            width = 64
+            height = 64
+            color1 = (0, 0, 255)
+            color2 = (255, 255, 255)
+            image = Image.new('RGB', (width, height), color1)
+            dc = ImageDraw.Draw(image)
+            dc.rectangle((width // 4, height // 4, width * 3 // 4, height * 3 // 4), fill=color2)
+            return image
+
+    def run(self):
+        """トレイアイコンのループを実行します。"""
+        image = self.create_image()
+        menu = pystray.Menu(
+            pystray.MenuItem("Capture", self.on_capture),
+            pystray.MenuItem("History", self.on_history),
+            pystray.MenuItem("Open Image...", self.on_open_image),
+            pystray.MenuItem("Paste Image", self.on_paste_image),
+            pystray.MenuItem("Show All", self.on_show_all),
+            pystray.MenuItem("Hide All", self.on_hide_all),
+            pystray.MenuItem("Exit", self.on_exit)
+        )
+        self.icon = pystray.Icon("SetunaClone", image, "Setuna Clone", menu)
+        self.icon.run()
+
+    def start_thread(self):
+        """トレイアイコンをバックグラウンドスレッドで開始します。"""
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def on_capture(self, icon, item):
+        """「Capture」メニュー項目のコールバック。"""
+        self.app.on_activate_capture()
+
+    def on_history(self, icon, item):
+        """「History」メニュー項目のコールバック。"""
+        self.app.show_history()
+
+    def on_open_image(self, icon, item):
+        """「Open Image...」メニュー項目のコールバック。"""
+        self.app.root.after(0, self.app.snippet_manager.ingestor.open_dialog)
+
+    def on_paste_image(self, icon, item):
+        """「Paste Image」メニュー項目のコールバック。"""
+        self.app.snippet_manager.ingestor.ingest_clipboard()
+
+    def on_show_all(self, icon, item):
+        """「Show All」メニュー項目のコールバック。"""
+        self.app.root.after(0, self.app.snippet_manager.show_all)
+
+    def on_hide_all(self, icon, item):
+        """「Hide All」メニュー項目のコールバック。"""
+        self.app.root.after(0, self.app.snippet_manager.hide_all)
+
+    def on_exit(self, icon, item):
+        """「Exit」メニュー項目のコールバック。"""
+        # すべてを停止する必要があります
+        icon.stop()
+        self.app.quit()
+
+class SetunaCloneApp:
+    """
+    メインアプリケーションクラス。
+    グローバルホットキー、付箋管理、Tkinterルートウィンドウを処理します。
+    """
+    def __init__(self, args=None, ipc_server=None):
+        """
+        Args:
+            args (list, optional): コマンドライン引数（ピン留めする画像ファイルや --capture）。
+            ipc_server (ipc.IPCServer, optional): 起動前にエンドポイントを確保済みのIPCサーバー。
+        """
+        self.root = tk.Tk()
+        self.root.withdraw() # メインウィンドウを隠す
+        self.snippet_manager = SnippetManager(self.root)
+        
+        # キャプチャ履歴（バックグラウンドで保存）
+        self.history = CaptureHistory()
+        self.history_browser = None
+        
+        # キャプチャ後処理パイプライン（pipeline.json がなければ無効）
+        self.pipeline = CapturePipeline.from_config(self.root)
+        
+        # ホットキーリスナー
+        self.listener = keyboard.GlobalHotKeys({
+            '<ctrl>+<shift>+z': self.on_activate_capture
+        })
+        self.listener.start()
+        
+        # トレイアイコン
+        self.tray = TrayIcon(self)
+        self.tray.start_thread()
+        
+        # 2回目の起動や外部ツールからの要求を受け付けるIPCサーバー（準備ができてから受け付けを開始）
+        self.ipc_server = ipc_server or ipc.IPCServer()
+        self.ipc_server.app = self
+        self.ipc_server.start()
+        
+        if args:
+            self.handle_args(args)
+
+        print("SETUNA2 Clone started. Press Ctrl+Shift+Z to capture.")
+
+    def on_activate_capture(self):
+        """ホットキーまたはトレイからキャプチャがアクティブ化されたときに呼び出されます。"""
+        print("Capture triggered!")
+        # GUI更新をメインスレッドで実行するために after を使用
+        self.root.after(0, self.start_capture)
+
+    def start_capture(self):
+        """キャプチャツールを開始します。"""
+        CaptureTool(self.root, self.on_capture_complete)
+
+    def on_capture_complete(self, image, x=None, y=None):
+        """キャプチャ完了時のコールバック。"""
+        if image:
+            window = self.snippet_manager.create_snippet(image, x, y)
+            self.history.add(image)
+            # 付箋はすぐに表示し、後処理の結果は完了時に付与する
+            self.pipeline.submit(
+                image, lambda results, summary: self.on_pipeline_done(window, results, summary),
+                origin=(x or 0, y or 0) # 固定領域の塗りつぶしはスクリーン座標で指定する
+            )
+
+    def on_pipeline_done(self, window, results, summary):
+        """キャプチャ後処理の完了時にメインスレッドで呼び出されます。"""
+        timings = ", ".join(f"{r['stage']} {r['elapsed_ms']:.1f}ms" for r in results if 'elapsed_ms' in r)
+        print(f"Pipeline done in {summary['total_ms']:.1f}ms (queued {summary['queued_ms']:.1f}ms): {timings}")
+        for r in results:
+            if 'error' in r:
+                print(f"Pipeline stage {r['stage']} failed: {r['error']}")
+        if not window.closed:
+            window.pipeline_results = results
+
+    def handle_args(self, args):
+        """
+        コマンドライン引数を処理します。IPCの受信スレッドからも呼び出されます。
+        画像ファイルはバックグラウンドで取り込みます。
+        """
+        paths = []
+        for arg in args:
+            if arg == '--capture':
+                self.on_activate_capture()
+            else:
+                paths.append(arg)
+        if paths:
+            self.snippet_manager.ingestor.ingest_files(paths)
+
+    def pin_images(self, pins):
+        """
+        (image, x, y, full_image_loader) のリストを付箋としてピン留めします。任意のスレッドから呼び出せます。
+        一括送信された画像は1回のコールバックでまとめて作成します。
+        """
+        def create():
+            for image, x, y, loader in pins:
+                self.snippet_manager.create_snippet(image, x, y, full_image_loader=loader)
+        self.root.after(0, create)
+
+    def show_history(self):
+        """トレイから履歴ブラウザを開きます。"""
+        self.root.after(0, self.open_history_browser)
+
+    def open_history_browser(self):
+        """履歴ブラウザを開きます（既に開いている場合は前面に表示）。"""
+        if self.history_browser and self.history_browser.exists():
+            self.history_browser.lift()
+            return
+        self.history_browser = HistoryBrowser(self.root, self.history, self.on_history_select)
+
+    def on_history_select(self, entry):
+        """履歴から選択された画像を付箋として再度ピン留めします。"""
+        try:
+            image = self.history.load_image(entry)
+        except OSError as e:
+            print(f"Failed to load history entry: {e}")
+            return
+        self.snippet_manager.create_snippet(image)
+
+    def quit(self):
+        """アプリケーションをクリーンアップして終了します。"""
+        self.root.quit()
+        # 必要であればリスナーを停止（デーモンスレッドなら通常は終了するが明示的に）
+        self.listener.stop()
+        self.ipc_server.close()
+        self.pipeline.shutdown()
+        self.snippet_manager.shutdown()
+        print(f"Snippet window pool: {self.snippet_manager.snippet_pool.report()}")
+        print(f"Group window pool: {self.snippet_manager.group_pool.report()}")
+        # 保留中の履歴書き込みを完了させる
+        self.history.close()
+
+    def run(self):
+        """メインイベントループを開始します。"""
+        self.root.mainloop()
@@ -0,0 +1,238 @@
+"""
+複数の画像を1つのファイル（複数ページPDF、複数ページTIFF、コンタクトシートPNG）に書き出します。
+画像は1枚ずつ変換・書き込みするため、枚数に関わらずメモリ使用量はおよそ画像1枚分に収まります。
+"""
+import tkinter as tk
+from tkinter import filedialog, ttk
+import os
+import math
+import zlib
+import threading
+from PIL import Image, TiffImagePlugin
+
+FILETYPES = [
+    ("PDF files", "*.pdf"),
+    ("TIFF files", "*.tif *.tiff"),
+    ("Contact sheet (PNG)", "*.png"),
+]
+
+
+def format_for_path(path):
+    """拡張子から書き出し形式（'pdf', 'tiff', 'sheet'）を判定します。"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.pdf':
+        return 'pdf'
+    if ext in ('.tif', '.tiff'):
+        return 'tiff'
+    if ext == '.png':
+        return 'sheet'
+    raise ValueError(f"Unsupported export format: {ext}")
+
+
+def export_images(images, path, fmt=None, progress=None, cancel=None):
+    """
+    画像を順に1つのファイルへ書き出します。
+
+    Args:
+        images (list): PIL画像、画像を返す関数（必要になったときに呼び出す）、
+            または (画像を返す関数, 読み込みに失敗したときの画像) のタプルのリスト。
+        path (str): 出力ファイルパス。
+        fmt (str, optional): 'pdf'、'tiff'、'sheet'。省略時は拡張子から判定。
+        progress (callable, optional): 1枚書き込むごとに (完了数, 総数) で呼ばれる関数。
+        cancel (threading.Event, optional): セットされると途中で中断します。
+
+    Returns:
+        すべて書き出した場合はTrue、中断した場合はFalse。
+    """
+    fmt = fmt or format_for_path(path)
+    writer = {'pdf': write_pdf, 'tiff': write_tiff, 'sheet': write_contact_sheet}[fmt]
+    total = len(images)
+
+    def pages():
+        for i, image in enumerate(images):
+            if cancel is not None and cancel.is_set():
+                return
+            yield load_page(image)
+            if progress:
+                progress(i + 1, total)
+
+    writer(pages(), path, total)
+    return not (cancel is not None and cancel.is_set())
+
+
+def load_page(item):
+    """export_images の要素を画像にします。"""
+    if isinstance(item, tuple):
+        loader, fallback = item
+        try:
+            return loader()
+        except OSError as e:
+            print(f"Failed to load full resolution image for export: {e}")
+            return fallback # 縮小プレビューで書き出す
+    return item() if callable(item) else item
+
+
+def write_pdf(pages, path, total):
+    """
+    画像ごとに1ページのPDFを書き出します。
+    PillowのPDF保存は全ページを先に走査するため、ここでは最小限のPDFを自前で逐次書き込みます。
+    """
+    offsets = {} # オブジェクト番号 -> ファイル内オフセット
+    page_ids = []
+    next_id = 3 # 1: Catalog, 2: Pages
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+        def write_object(obj_id, body, stream=None):
+            offsets[obj_id] = f.tell()
+            f.write(f"{obj_id} 0 obj\n".encode())
+            f.write(body)
+            if stream is not None:
+                f.write(b"\nstream\n")
+                f.write(stream)
+                f.write(b"\nendstream")
+            f.write(b"\nendobj\n")
+
+        for image in pages:
+            rgb = image.convert("RGB")
+            w, h = rgb.size
+            data = zlib.compress(rgb.tobytes(), 6)
+            del rgb
+
+            image_id, content_id, page_id = next_id, next_id + 1, next_id + 2
+            next_id += 3
+            write_object(image_id, (
+                f"<< /Type /XObject /Subtype /Image /Width {w} /Height {h} "
+                f"/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /FlateDecode /Length {len(data)} >>"
+            ).encode(), data)
+            content = f"q {w} 0 0 {h} 0 0 cm /Im0 Do Q".encode()
+            write_object(content_id, f"<< /Length {len(content)} >>".encode(), content)
+            write_object(page_id, (
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {w} {h}] "
+                f"/Resources << /XObject << /Im0 {image_id} 0 R >> >> /Contents {content_id} 0 R >>"
+            ).encode())
+            page_ids.append(page_id)
+
+        kids = " ".join(f"{i} 0 R" for i in page_ids)
+        write_object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode())
+        write_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+        xref_offset = f.tell()
+        f.write(f"xref\n0 {next_id}\n".encode())
+        f.write(b"0000000000 65535 f \n")
+        for obj_id in range(1, next_id):
+            f.write(f"{offsets[obj_id]:010d} 00000 n \n".encode())
+        f.write(f"trailer\n<< /Size {next_id} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+
+
+def write_tiff(pages, path, total):
+    """画像ごとに1ページの複数ページTIFFを追記形式で書き出します。"""
+    with TiffImagePlugin.AppendingTiffWriter(path, True) as tf:
+        for image in pages:
+            if image.mode not in ("RGB", "RGBA", "L"):
+                image = image.convert("RGB")
+            image.save(tf, "TIFF", compression="tiff_deflate")
+            tf.newFrame()
+
+
+def write_contact_sheet(pages, path, total, tile_size=(320, 240), gap=8):
+    """画像を縮小してタイル状に並べた1枚のPNGを書き出します。"""
+    columns = max(1, math.ceil(math.sqrt(total)))
+    rows = max(1, math.ceil(total / columns))
+    tile_w, tile_h = tile_size
+    sheet = Image.new("RGB", (
+        columns * (tile_w + gap) + gap,
+        rows * (tile_h + gap) + gap
+    ), (255, 255, 255))
+
+    for i, image in enumerate(pages):
+        thumb = image.convert("RGB")
+        thumb.thumbnail(tile_size, Image.Resampling.LANCZOS)
+        col, row = i % columns, i // columns
+        # タイル内で中央揃え
+        x = gap + col * (tile_w + gap) + (tile_w - thumb.width) // 2
+        y = gap + row * (tile_h + gap) + (tile_h - thumb.height) // 2
+        sheet.paste(thumb, (x, y))
+    sheet.save(path, "PNG")
+
+
+def ask_and_export(master, images):
+    """
+    保存先をユーザーに尋ね、バックグラウンドで書き出しを開始します。
+    """
+    if not images:
+        return
+    filename = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=FILETYPES)
+    if not filename:
+        return
+    try:
+        format_for_path(filename)
+    except ValueError as e:
+        print(e)
+        return
+    ExportProgressWindow(master, images, filename)
+
+
+class ExportProgressWindow:
+    """
+    書き出しをワーカースレッドで実行し、進捗バーを表示するウィンドウ。
+    """
+    def __init__(self, master, images, path):
+        """
+        Args:
+            master: 親となるTkinterウィジェット。
+            images (list): 書き出す画像のリスト（export_images を参照）。
+            path (str): 出力ファイルパス。
+        """
+        self.master = master
+        self.path = path
+        self.total = len(images)
+        self.cancel_event = threading.Event()
+
+        self.window = tk.Toplevel(master)
+        self.window.title("Exporting...")
+        self.window.attributes('-topmost', True)
+        self.window.resizable(False, False)
+
+        self.status = tk.Label(self.window, text=f"0 / {self.total}", anchor='w')
+        self.status.pack(fill=tk.X, padx=10, pady=(10, 4))
+        self.bar = ttk.Progressbar(self.window, length=280, maximum=self.total, mode='determinate')
+        self.bar.pack(padx=10)
+        tk.Button(self.window, text="Cancel", command=self.cancel_event.set).pack(pady=8)
+        self.window.protocol("WM_DELETE_WINDOW", self.cancel_event.set)
+
+        # 付箋の編集はコピーオンライトのため、書き出し中に編集されてもこの時点の画像のまま書き出される
+        self.thread = threading.Thread(target=self.run, args=(list(images),), daemon=True)
+        self.thread.start()
+
+    def run(self, images):
+        try:
+            completed = export_images(images, self.path, progress=self.on_progress, cancel=self.cancel_event)
+            error = None
+        except Exception as e:
+            completed, error = False, e
+        self.master.after(0, lambda: self.finish(completed, error))
+
+    def on_progress(self, done, total):
+        """ワーカースレッドから呼ばれるため、GUI更新はメインスレッドに回します。"""
+        self.master.after(0, lambda: self.update_progress(done, total))
+
+    def update_progress(self, done, total):
+        if self.window.winfo_exists():
+            self.bar['value'] = done
+            self.status.config(text=f"{done} / {total}")
+
+    def finish(self, completed, error):
+        if completed:
+            print(f"Exported {self.total} images to {self.path}")
+        else:
+            if error is not None:
+                print(f"Export failed: {error}")
+            else:
+                print("Export cancelled")
+            try:
+                os.remove(self.path) # 中途半端なファイルを残さない
+            except OSError:
+                pass
+        self.window.destroy()
@@ -0,0 +1,259 @@
+import tkinter as tk
+import os
+import json
+import time
+import queue
+import threading
+from PIL import Image, ImageTk
+from utils import get_app_data_dir
+
+class CaptureHistory:
+    """
+    キャプチャ画像をディスク上のリングバッファとして保存します。
+    保存件数と合計バイト数の上限を超えると古いものから削除されます。
+    書き込みとサムネイル生成はバックグラウンドスレッドで行われるため、
+    キャプチャ処理の遅延にはなりません。
+    """
+    INDEX_FILE = "index.json"
+
+    def __init__(self, directory=None, max_count=200, max_bytes=200 * 1024 * 1024, thumb_size=(160, 120)):
+        """
+        Args:
+            directory (str, optional): 保存先ディレクトリ。デフォルトはアプリデータ配下の history。
+            max_count (int): 保持する最大件数。
+            max_bytes (int): 保持する画像ファイルの合計最大バイト数。
+            thumb_size (tuple): サムネイルの最大サイズ (幅, 高さ)。
+        """
+        self.directory = directory or os.path.join(get_app_data_dir(), "history")
+        self.thumb_dir = os.path.join(self.directory, "thumbs")
+        os.makedirs(self.thumb_dir, exist_ok=True)
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        self.thumb_size = thumb_size
+
+        self.lock = threading.Lock() # entries を保護
+        self.entries = self.load_index()
+        self.thumb_cache = {} # id -> PIL Image（メモリ上のサムネイルキャッシュ）
+        self.seq = 0
+
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def add(self, image):
+        """
+        キャプチャ画像を保存キューに追加します。すぐに戻ります。
+        """
+        self.queue.put(('save', image, time.time()))
+
+    def request_thumbnail(self, entry, callback):
+        """
+        サムネイルをバックグラウンドで取得し、callback(entry, thumb) を呼び出します。
+        callback はワーカースレッドから呼ばれる点に注意してください。
+        """
+        self.queue.put(('thumb', entry, callback))
+
+    def get_entries(self):
+        """保存済みエントリのリスト（新しい順）を返します。"""
+        with self.lock:
+            return list(reversed(self.entries))
+
+    def load_image(self, entry):
+        """エントリのフル解像度画像を読み込みます。"""
+        image = Image.open(self.image_path(entry))
+        image.load()
+        return image
+
+    def image_path(self, entry):
+        return os.path.join(self.directory, entry['file'])
+
+    def thumb_path(self, entry):
+        return os.path.join(self.thumb_dir, f"{entry['id']}.png")
+
+    def close(self, timeout=5.0):
+        """保留中の書き込みを完了させてからワーカーを停止します。"""
+        self.queue.put(('stop', None, None))
+        self.thread.join(timeout)
+
+    # ワーカースレッド
+    def run(self):
+        while True:
+            task, arg1, arg2 = self.queue.get()
+            try:
+                if task == 'stop':
+                    break
+                elif task == 'save':
+                    self.write_entry(arg1, arg2)
+                elif task == 'thumb':
+                    arg2(arg1, self.get_thumbnail(arg1))
+            except Exception as e:
+                print(f"History worker error: {e}")
+            # 連続キャプチャ時はインデックスの書き込みをまとめる
+            if task == 'save' and self.queue.empty():
+                self.save_index()
+        self.save_index()
+
+    def write_entry(self, image, timestamp):
+        self.seq += 1
+        entry_id = time.strftime("%Y%m%d-%H%M%S", time.localtime(timestamp)) + f"-{int(timestamp * 1000) % 1000:03d}-{self.seq}"
+        filename = f"{entry_id}.png"
+        path = os.path.join(self.directory, filename)
+        tmp_path = path + ".tmp"
+        image.save(tmp_path, "PNG")
+        os.replace(tmp_path, path)
+
+        entry = {
+            'id': entry_id,
+            'file': filename,
+            'bytes': os.path.getsize(path),
+            'width': image.width,
+            'height': image.height,
+            'timestamp': timestamp,
+        }
+        with self.lock:
+            self.entries.append(entry)
+            evicted = self.evict()
+        for old in evicted:
+            self.remove_files(old)
+
+    def evict(self):
+        """上限を超えた古いエントリをリストから外して返します（lock保持中に呼び出すこと）。"""
+        evicted = []
+        total = sum(e['bytes'] for e in self.entries)
+        while self.entries and (len(self.entries) > self.max_count or total > self.max_bytes):
+            old = self.entries.pop(0)
+            total -= old['bytes']
+            evicted.append(old)
+        return evicted
+
+    def remove_files(self, entry):
+        self.thumb_cache.pop(entry['id'], None)
+        for path in (self.image_path(entry), self.thumb_path(entry)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def get_thumbnail(self, entry):
+        """メモリ → ディスク → 生成 の順にサムネイルを取得します。"""
+        thumb = self.thumb_cache.get(entry['id'])
+        if thumb is not None:
+            return thumb
+
+        path = self.thumb_path(entry)
+        if os.path.exists(path):
+            thumb = Image.open(path)
+            thumb.load()
+        else:
+            with Image.open(self.image_path(entry)) as image:
+                image.thumbnail(self.thumb_size, Image.Resampling.LANCZOS)
+                thumb = image.convert("RGB")
+            thumb.save(path, "PNG")
+        self.thumb_cache[entry['id']] = thumb
+        return thumb
+
+    # インデックス
+    def load_index(self):
+        path = os.path.join(self.directory, self.INDEX_FILE)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return []
+        # 画像ファイルが失われたエントリは除外
+        return [e for e in entries if os.path.exists(self.image_path(e))]
+
+    def save_index(self):
+        path = os.path.join(self.directory, self.INDEX_FILE)
+        with self.lock:
+            data = list(self.entries)
+        try:
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Failed to save history index: {e}")
+
+
+class HistoryBrowser:
+    """
+    キャプチャ履歴をサムネイル一覧で表示するウィンドウ。
+    サムネイルをクリックすると、その画像を付箋として再度ピン留めします。
+    """
+    COLUMNS = 4
+
+    def __init__(self, master, history, on_select):
+        """
+        Args:
+            master: 親となるTkinterウィジェット。
+            history (CaptureHistory): 表示する履歴。
+            on_select (callable): エントリが選択されたときに entry を受け取る関数。
+        """
+        self.master = master
+        self.history = history
+        self.on_select = on_select
+        self.buttons = {} # id -> Button
+        self.tk_thumbs = {} # GCを防ぐために参照を保持
+
+        self.window = tk.Toplevel(master)
+        self.window.title("Capture History")
+        self.window.attributes('-topmost', True)
+
+        self.canvas = tk.Canvas(self.window, highlightthickness=0, width=4 * 176, height=420)
+        scrollbar = tk.Scrollbar(self.window, orient=tk.VERTICAL, command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.frame = tk.Frame(self.canvas)
+        self.canvas.create_window((0, 0), window=self.frame, anchor='nw')
+        self.frame.bind("<Configure>", lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all")))
+        self.canvas.bind("<MouseWheel>", lambda e: self.canvas.yview_scroll(-1 if e.delta > 0 else 1, "units"))
+        self.window.bind("<Escape>", lambda e: self.close())
+
+        self.populate()
+
+    def populate(self):
+        entries = self.history.get_entries()
+        if not entries:
+            tk.Label(self.frame, text="No captures yet.").grid(row=0, column=0, padx=8, pady=8)
+            return
+
+        for i, entry in enumerate(entries):
+            stamp = time.strftime("%m/%d %H:%M:%S", time.localtime(entry['timestamp']))
+            button = tk.Button(
+                self.frame, text=f"{stamp}\n{entry['width']}x{entry['height']}",
+                width=20, height=8, compound='top',
+                command=lambda e=entry: self.on_select(e)
+            )
+            button.grid(row=i // self.COLUMNS, column=i % self.COLUMNS, padx=4, pady=4)
+            self.buttons[entry['id']] = button
+            # サムネイルはワーカーで遅延生成
+            self.history.request_thumbnail(entry, self.on_thumbnail_ready)
+
+    def on_thumbnail_ready(self, entry, thumb):
+        """ワーカースレッドから呼ばれるため、GUI更新はメインスレッドに回します。"""
+        self.master.after(0, lambda: self.set_thumbnail(entry, thumb))
+
+    def set_thumbnail(self, entry, thumb):
+        button = self.buttons.get(entry['id'])
+        if button is None or not button.winfo_exists():
+            return
+        tk_img = ImageTk.PhotoImage(thumb)
+        self.tk_thumbs[entry['id']] = tk_img
+        # 画像を設定すると width/height はピクセル単位になる
+        button.config(image=tk_img, width=self.history.thumb_size[0], height=self.history.thumb_size[1] + 32)
+
+    def lift(self):
+        self.window.deiconify()
+        self.window.lift()
+
+    def exists(self):
+        try:
+            return bool(self.window.winfo_exists())
+        except tk.TclError:
+            return False
+
+    def close(self):
+        self.window.destroy()
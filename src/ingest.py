@@ -0,0 +1,146 @@
+"""
+既存の画像（クリップボード、ドロップされたファイル、ファイル選択）を付箋として取り込みます。
+デコードはバックグラウンドスレッドで行い、大きな画像はJPEGのdraft（DCTスケーリング）と
+reduce（整数倍の縮小）で画面サイズ以下のプレビューをすぐに表示します。
+フル解像度は、拡大・コピー・トリミング・保存などで必要になったときに初めて読み込みます。
+"""
+import math
+import threading
+from tkinter import filedialog
+from PIL import Image, ImageGrab, ImageOps
+
+try:
+    import windnd # ドラッグ＆ドロップ（オプション）
+except ImportError:
+    windnd = None
+
+FILETYPES = [
+    ("Image files", "*.png *.jpg *.jpeg *.bmp *.gif *.tif *.tiff *.webp"),
+    ("All files", "*.*"),
+]
+
+
+class FullResolutionLoader:
+    """フル解像度の画像を読み込む呼び出し可能オブジェクト。"""
+    def __init__(self, path):
+        self.path = path
+
+    def __call__(self):
+        with Image.open(self.path) as image:
+            image.load()
+            return ImageOps.exif_transpose(image)
+
+
+def decode_preview(path, max_size):
+    """
+    画像ファイルを max_size に収まるプレビューとしてデコードします。
+    高品質なリサンプリングは行わず（フル解像度の表示時に行う）、速度を優先します。
+
+    Returns:
+        (preview, loader) のタプル。縮小していない場合 loader は None。
+    """
+    with Image.open(path) as image:
+        full_size = image.size
+        if image.getexif().get(0x0112, 1) in (5, 6, 7, 8):
+            # 90度回転して表示される画像は、回転後に max_size に収まるよう縦横を入れ替えて縮小する
+            max_size = (max_size[1], max_size[0])
+        if image.format == 'JPEG':
+            # DCTスケーリングで 1/2〜1/8 の解像度で直接デコード（フルデコードしない）
+            image.draft('RGB', max_size)
+        image.load()
+        factor = math.ceil(max(image.width / max_size[0], image.height / max_size[1]))
+        if factor > 1:
+            # draft で縮めきれない分は整数倍の平均化で縮小する（LANCZOSより大幅に速い）
+            image = image.reduce(factor)
+        reduced = image.size != full_size
+        preview = ImageOps.exif_transpose(image)
+    return preview, FullResolutionLoader(path) if reduced else None
+
+
+def load_in_background(widget, load, callback):
+    """
+    load() をワーカースレッドで実行し、結果を callback(result) としてメインスレッドに返します。
+    読み込みに失敗した場合は callback(None) を呼び出します。
+    """
+    def run():
+        try:
+            result = load()
+        except (OSError, ValueError) as e:
+            print(f"Failed to load image: {e}")
+            result = None
+        widget.after(0, lambda: callback(result))
+    threading.Thread(target=run, daemon=True).start()
+
+
+def hook_drop_files(window, callback):
+    """
+    ウィンドウへのファイルのドロップを callback(paths) に渡します。
+    windnd がインストールされていない場合は何もせず False を返します。
+    """
+    if windnd is None:
+        return False
+    # force_unicode=True でUnicode版のAPIを使い、str のパスを受け取る（日本語などのパスに対応）
+    windnd.hook_dropfiles(window, func=callback, force_unicode=True)
+    return True
+
+
+class ImageIngestor:
+    """
+    画像の取り込みを管理します。
+    各入力はワーカースレッドでデコードされ、付箋の作成のみメインスレッドで行われます。
+    """
+    def __init__(self, manager, preview_size=None):
+        """
+        Args:
+            manager (SnippetManager): 付箋を作成するマネージャー。
+            preview_size (tuple, optional): プレビューの最大サイズ。デフォルトは画面サイズ。
+        """
+        self.manager = manager
+        self.root = manager.root
+        self.preview_size = preview_size or (self.root.winfo_screenwidth(), self.root.winfo_screenheight())
+
+    def decode_file(self, path):
+        """呼び出し元のスレッドでプレビューをデコードし、(preview, loader) を返します。"""
+        return decode_preview(path, self.preview_size)
+
+    def ingest_files(self, paths, x=None, y=None):
+        """
+        ファイルを付箋として取り込みます。すぐに戻ります。
+        位置を指定した場合、複数のファイルは少しずつずらして配置します。
+        """
+        for i, path in enumerate(paths):
+            pos = (x + i * 24, y + i * 24) if x is not None and y is not None else (None, None)
+            threading.Thread(target=self.load_file, args=(path,) + pos, daemon=True).start()
+
+    def load_file(self, path, x, y):
+        try:
+            preview, loader = self.decode_file(path)
+        except (OSError, ValueError) as e:
+            print(f"Failed to open {path}: {e}")
+            return
+        self.root.after(0, lambda: self.manager.create_snippet(preview, x, y, full_image_loader=loader))
+
+    def ingest_clipboard(self):
+        """クリップボードの画像（またはコピーされた画像ファイル）を取り込みます。"""
+        threading.Thread(target=self.load_clipboard, daemon=True).start()
+
+    def load_clipboard(self):
+        try:
+            content = ImageGrab.grabclipboard()
+        except (OSError, NotImplementedError) as e:
+            print(f"Failed to read clipboard: {e}")
+            return
+        if isinstance(content, Image.Image):
+            content.load()
+            self.root.after(0, lambda: self.manager.create_snippet(content))
+        elif content:
+            # エクスプローラーでコピーされたファイルのリスト
+            self.ingest_files(list(content))
+        else:
+            print("No image in clipboard")
+
+    def open_dialog(self):
+        """ファイル選択ダイアログで選んだ画像を取り込みます。"""
+        paths = filedialog.askopenfilenames(filetypes=FILETYPES)
+        if paths:
+            self.ingest_files(list(paths))
@@ -0,0 +1,287 @@
+"""
+単一インスタンス用のローカルIPC。
+起動中のアプリがエンドポイント（Windowsは名前付きパイプ、それ以外はUnixソケット、
+どちらも使えない場合はループバックTCP）を所有し、2回目の起動や外部スクリプトから
+引数や画像を受け取って付箋としてピン留めします。
+
+メッセージはJSONヘッダー（send_bytes）で送り、生ピクセルの場合は続けて
+ペイロードをそのまま送ります。画像の再エンコードは行いません。
+2回目の起動で転送だけを素早く行えるよう、このモジュールは標準ライブラリのみを先頭でインポートします
+（Pillowは画像を扱う関数の中で読み込みます）。
+
+    {"cmd": "args", "args": [...]}
+    {"cmd": "pin_file", "path": "...", "x": 0, "y": 0}
+    {"cmd": "pin_raw", "mode": "RGB", "size": [w, h], "x": 0, "y": 0}  + ペイロード
+    {"cmd": "batch", "items": [上記のpin_file/pin_raw...]}              + 生ピクセル分のペイロード
+"""
+import os
+import sys
+import json
+import socket
+import threading
+from multiprocessing.connection import Listener, Client, AuthenticationError
+from utils import get_app_data_dir
+
+ENDPOINT_FILE = "ipc.json"
+RAW_MODES = ("RGB", "RGBA", "L")
+
+
+def get_endpoint_path():
+    return os.path.join(get_app_data_dir(), ENDPOINT_FILE)
+
+
+def get_native_endpoint():
+    """プラットフォーム標準のエンドポイント (family, address) を返します。"""
+    if sys.platform == 'win32':
+        user = os.environ.get('USERNAME', 'user')
+        return 'AF_PIPE', rf'\\.\pipe\SetunaClone-{user}'
+    return 'AF_UNIX', os.path.join(get_app_data_dir(), "ipc.sock")
+
+
+def socket_in_use(path):
+    """
+    Unixソケットが起動中のインスタンスに使われているか調べます。
+    前回異常終了したときに残った応答のないソケットファイルは削除します。
+    """
+    if not os.path.exists(path):
+        return False
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+        return True
+    except OSError:
+        os.unlink(path) # 応答なし = 古いソケット
+        return False
+    finally:
+        probe.close()
+
+
+class IPCServer:
+    """
+    起動中のSetunaCloneAppが所有するIPCエンドポイント。
+    起動直後にエンドポイントを確保し（bind）、アプリの準備ができてから受け付けを開始します（start）。
+    確保から受け付け開始までの接続はOSのバックログで待たされるため、起動中に2回目の起動があっても
+    2つ目のインスタンスは作られません。
+    接続はバックグラウンドスレッドで受け付け、画像のデコードもそこで行い、
+    付箋の作成のみを root.after でメインスレッドに渡します。
+    """
+    def __init__(self, app=None):
+        """
+        Args:
+            app: メインのSetunaCloneAppインスタンス。start() までに設定してください。
+        """
+        self.app = app
+        self.authkey = os.urandom(32)
+        self.listener = None
+        self.family = None
+        self.thread = None
+        self.endpoint_busy = False # 別のインスタンスがエンドポイントを所有している
+
+    def bind(self):
+        """
+        エンドポイントを作成して接続先ファイルを書き出します。成功するとTrueを返します。
+        別のインスタンスが所有している場合は endpoint_busy を立ててFalseを返します。
+        """
+        family, address = get_native_endpoint()
+        self.endpoint_busy = False
+        try:
+            if family == 'AF_UNIX' and socket_in_use(address):
+                self.endpoint_busy = True
+                return False
+            self.listener = Listener(address, family, backlog=8, authkey=self.authkey)
+            self.family = family
+        except (OSError, ValueError) as e:
+            if getattr(e, 'winerror', None) in (5, 231): # 名前付きパイプが既に作成されている
+                self.endpoint_busy = True
+                return False
+            print(f"Native IPC endpoint unavailable ({e}). Falling back to loopback.")
+            try:
+                self.listener = Listener(('127.0.0.1', 0), 'AF_INET', backlog=8, authkey=self.authkey)
+                self.family = 'AF_INET'
+            except OSError as e:
+                print(f"Failed to start IPC server: {e}")
+                return False
+
+        self.write_endpoint()
+        return True
+
+    def start(self):
+        """受け付けスレッドを開始します（未確保ならエンドポイントも作成します）。成功するとTrueを返します。"""
+        if self.listener is None and not self.bind():
+            return False
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+        return True
+
+    def write_endpoint(self):
+        """クライアントが接続先と認証キーを知るためのファイルを書き出します（本人のみ読み取り可）。"""
+        address = self.listener.address
+        data = {
+            'family': self.family,
+            'address': list(address) if isinstance(address, tuple) else address,
+            'authkey': self.authkey.hex(),
+            'pid': os.getpid(),
+        }
+        path = get_endpoint_path()
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+    def serve(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except AuthenticationError:
+                continue # 認証キーを持たない接続は無視
+            except OSError:
+                break # リスナーが閉じられた
+            threading.Thread(target=self.handle_connection, args=(conn,), daemon=True).start()
+
+    def handle_connection(self, conn):
+        with conn:
+            while True:
+                try:
+                    header = json.loads(conn.recv_bytes())
+                except (EOFError, OSError):
+                    break
+                except ValueError as e:
+                    conn.send_bytes(json.dumps({'ok': False, 'error': f"bad header: {e}"}).encode())
+                    continue
+                try:
+                    reply = self.handle_message(header, conn)
+                except Exception as e:
+                    reply = {'ok': False, 'error': str(e)}
+                if reply is not None:
+                    conn.send_bytes(json.dumps(reply).encode())
+
+    def handle_message(self, header, conn):
+        cmd = header.get('cmd')
+        if cmd == 'args':
+            # 転送元をすぐに終了させるため、処理の前に応答する
+            conn.send_bytes(json.dumps({'ok': True}).encode())
+            self.app.handle_args(header.get('args', []))
+            return None
+        if cmd in ('pin_file', 'pin_raw'):
+            items = [header]
+        elif cmd == 'batch':
+            items = header.get('items', [])
+        else:
+            return {'ok': False, 'error': f"unknown command: {cmd}"}
+
+        # ペイロードは全て受信してから検証する（ストリームの同期を保つため）
+        payloads = [conn.recv_bytes() if item.get('cmd') == 'pin_raw' else None for item in items]
+        pins = []
+        errors = []
+        for item, payload in zip(items, payloads):
+            try:
+                image, loader = self.decode_item(item, payload)
+                pins.append((image, item.get('x'), item.get('y'), loader))
+            except Exception as e:
+                errors.append(str(e))
+        if pins:
+            self.app.pin_images(pins)
+        return {'ok': not errors, 'pinned': len(pins), 'errors': errors}
+
+    def decode_item(self, item, payload):
+        """(image, full_image_loader) を返します。大きな画像ファイルは縮小プレビューとしてデコードします。"""
+        if item.get('cmd') == 'pin_file':
+            return self.app.snippet_manager.ingestor.decode_file(item['path'])
+        from PIL import Image
+        mode = item.get('mode', 'RGB')
+        if mode not in RAW_MODES:
+            raise ValueError(f"unsupported mode: {mode}")
+        width, height = item['size']
+        # バッファをそのまま参照（コピー・再エンコードなし）。描画時にはPILが書き込み可能なコピーを作成する
+        return Image.frombuffer(mode, (int(width), int(height)), payload, 'raw', mode, 0, 1), None
+
+    def close(self):
+        if self.listener is None:
+            return
+        try:
+            with open(get_endpoint_path(), "r", encoding="utf-8") as f:
+                owned = json.load(f).get('pid') == os.getpid()
+        except (OSError, ValueError):
+            owned = False
+        if owned:
+            try:
+                os.remove(get_endpoint_path())
+            except OSError:
+                pass
+        self.listener.close()
+        self.listener = None
+
+
+# クライアント側
+def connect():
+    """起動中のインスタンスに接続します。起動していなければNoneを返します。"""
+    try:
+        with open(get_endpoint_path(), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        address = data['address']
+        if isinstance(address, list):
+            address = tuple(address)
+        return Client(address, data['family'], authkey=bytes.fromhex(data['authkey']))
+    except (OSError, ValueError, KeyError, EOFError, AuthenticationError):
+        return None
+
+
+def send_message(conn, header, payloads=()):
+    """ヘッダーとペイロードを送信し、サーバーの応答を返します。"""
+    conn.send_bytes(json.dumps(header).encode())
+    for payload in payloads:
+        conn.send_bytes(payload)
+    return json.loads(conn.recv_bytes())
+
+
+def forward_to_running_instance(args):
+    """
+    起動中のインスタンスに引数を転送します。
+    転送できた場合はTrue（呼び出し元はそのまま終了する）、起動していなければFalseを返します。
+    """
+    conn = connect()
+    if conn is None:
+        return False
+    # 相対パスは転送元のカレントディレクトリ基準で解決する
+    args = [a if a.startswith('--') else os.path.abspath(a) for a in args]
+    with conn:
+        try:
+            send_message(conn, {'cmd': 'args', 'args': args})
+        except (OSError, EOFError):
+            return False
+    return True
+
+
+def raw_item(image, x=None, y=None):
+    """PIL画像を pin_raw 用の (ヘッダー, ペイロード) に変換します。"""
+    if image.mode not in RAW_MODES:
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    header = {'cmd': 'pin_raw', 'mode': image.mode, 'size': list(image.size), 'x': x, 'y': y}
+    return header, image.tobytes()
+
+
+def pin_images(items):
+    """
+    複数の画像を一括でピン留めします。
+
+    Args:
+        items: ファイルパス(str)、PIL画像、または (ヘッダー, ペイロード) のリスト。
+
+    Returns:
+        サーバーの応答dict。起動中のインスタンスがない場合はNone。
+    """
+    from PIL import Image
+    headers = []
+    payloads = []
+    for item in items:
+        if isinstance(item, str):
+            headers.append({'cmd': 'pin_file', 'path': os.path.abspath(item)})
+            continue
+        header, payload = raw_item(item) if isinstance(item, Image.Image) else item
+        headers.append(header)
+        payloads.append(payload)
+
+    conn = connect()
+    if conn is None:
+        return None
+    with conn:
+        return send_message(conn, {'cmd': 'batch', 'items': headers}, payloads)
@@ -0,0 +1,378 @@
+"""
+キャプチャ後の処理パイプライン。
+自動保存、形式変換、縮小、固定領域の塗りつぶし、知覚ハッシュ、外部コマンド実行などの
+ステージを、プロセスプール（またはスレッドプール）上で順に実行します。
+Tkのメインループはブロックせず、結果は root.after でメインスレッドに返されます。
+
+設定はアプリデータディレクトリの pipeline.json から読み込みます（ファイルがなければ無効）。
+
+    {
+        "executor": "process",
+        "max_workers": 2,
+        "max_pending": 8,
+        "stages": [
+            {"type": "redact", "regions": [[0, 0, 200, 40]]},   # スクリーン座標
+            {"type": "downscale", "max_width": 1920, "max_height": 1080},
+            {"type": "convert", "mode": "RGB", "format": "JPEG", "quality": 90},
+            {"type": "autosave", "directory": "C:/Users/me/Pictures/Setuna"},
+            {"type": "phash"},
+            {"type": "command", "args": ["optipng", "{path}"]}
+        ]
+    }
+"""
+import os
+import json
+import time
+import tempfile
+import subprocess
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from PIL import Image, ImageDraw
+from utils import get_app_data_dir
+
+CONFIG_FILE = "pipeline.json"
+
+
+class Stage:
+    """
+    パイプラインのステージの基底クラス。
+    プロセスプールに渡されるため、属性はpickle可能な値のみにしてください。
+    """
+    name = "stage"
+
+    def run(self, image, context):
+        """
+        Args:
+            image (PIL.Image.Image): 前のステージまでの処理結果。
+            context (dict): ステージ間で共有される情報（保存先パスや出力形式など）。
+
+        Returns:
+            (image, result) のタプル。result はこのステージの結果dict。
+        """
+        raise NotImplementedError
+
+
+class AutoSaveStage(Stage):
+    """画像を指定ディレクトリに保存します。形式は直前の ConvertStage に従います。"""
+    name = "autosave"
+
+    def __init__(self, directory=None, prefix="capture"):
+        self.directory = directory or os.path.join(get_app_data_dir(), "captures")
+        self.prefix = prefix
+
+    def run(self, image, context):
+        os.makedirs(self.directory, exist_ok=True)
+        fmt = context.get('format', 'PNG')
+        ext = {'JPEG': 'jpg', 'TIFF': 'tif'}.get(fmt, fmt.lower())
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(context['captured_at']))
+        path = os.path.join(self.directory, f"{self.prefix}-{stamp}-{context['seq']}.{ext}")
+        image.save(path, fmt, **context.get('save_options', {}))
+        context['saved_path'] = path
+        return image, {'path': path, 'bytes': os.path.getsize(path)}
+
+
+class ConvertStage(Stage):
+    """画像モードと、以降の保存で使う出力形式を変更します。"""
+    name = "convert"
+
+    def __init__(self, mode=None, format='PNG', quality=None):
+        self.mode = mode
+        self.format = format.upper()
+        self.quality = quality
+
+    def run(self, image, context):
+        mode = self.mode
+        if mode is None and self.format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            mode = 'RGB' # JPEGはアルファを扱えない
+        if mode and image.mode != mode:
+            image = image.convert(mode)
+        context['format'] = self.format
+        context['save_options'] = {'quality': self.quality} if self.quality else {}
+        return image, {'mode': image.mode, 'format': self.format}
+
+
+class DownscaleStage(Stage):
+    """指定サイズに収まるよう縮小します（拡大はしません）。"""
+    name = "downscale"
+
+    def __init__(self, max_width=1920, max_height=1080):
+        self.max_width = max_width
+        self.max_height = max_height
+
+    def run(self, image, context):
+        original = image.size
+        if image.width > self.max_width or image.height > self.max_height:
+            image = image.copy()
+            image.thumbnail((self.max_width, self.max_height), Image.Resampling.LANCZOS)
+        return image, {'from': list(original), 'to': list(image.size)}
+
+
+class RedactStage(Stage):
+    """
+    画面上の固定領域（スクリーン座標）を塗りつぶします。
+    キャプチャの画面上の位置（context['origin']）を基準にキャプチャ画像内の座標へ変換し、画像の範囲に収めます。
+    """
+    name = "redact"
+
+    def __init__(self, regions=(), color=(0, 0, 0)):
+        self.regions = [tuple(r) for r in regions]
+        self.color = tuple(color)
+
+    def run(self, image, context):
+        origin_x, origin_y = context.get('origin', (0, 0))
+        image = image.copy()
+        draw = ImageDraw.Draw(image)
+        applied = 0
+        for x1, y1, x2, y2 in self.regions:
+            x1 = max(0, x1 - origin_x)
+            y1 = max(0, y1 - origin_y)
+            x2 = min(image.width - 1, x2 - origin_x)
+            y2 = min(image.height - 1, y2 - origin_y)
+            if x1 <= x2 and y1 <= y2:
+                draw.rectangle([x1, y1, x2, y2], fill=self.color)
+                applied += 1
+        return image, {'regions': applied}
+
+
+class PerceptualHashStage(Stage):
+    """差分ハッシュ（dHash）を計算します。重複キャプチャの検出などに使えます。"""
+    name = "phash"
+
+    def __init__(self, hash_size=8):
+        self.hash_size = hash_size
+
+    def run(self, image, context):
+        size = self.hash_size
+        small = image.convert('L').resize((size + 1, size), Image.Resampling.BILINEAR)
+        pixels = small.tobytes()
+        value = 0
+        for row in range(size):
+            offset = row * (size + 1)
+            for col in range(size):
+                value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+        context['phash'] = value
+        return image, {'hash': f"{value:0{size * size // 4}x}"}
+
+
+class CommandStage(Stage):
+    """
+    外部コマンドを実行します。引数中の {path} は保存済みファイルのパスに置き換えられます
+    （まだ保存されていない場合は一時ファイルに書き出します）。
+    """
+    name = "command"
+
+    def __init__(self, args, timeout=30):
+        self.args = list(args)
+        self.timeout = timeout
+
+    def run(self, image, context):
+        path = context.get('saved_path')
+        temp_path = None
+        if path is None:
+            fd, temp_path = tempfile.mkstemp(suffix=".png")
+            os.close(fd)
+            image.save(temp_path, "PNG")
+            path = temp_path
+        try:
+            completed = subprocess.run(
+                [a.replace("{path}", path) for a in self.args],
+                capture_output=True, text=True, timeout=self.timeout
+            )
+        finally:
+            if temp_path:
+                os.remove(temp_path)
+        return image, {'returncode': completed.returncode, 'stdout': completed.stdout[-1000:]}
+
+
+STAGE_TYPES = {
+    'autosave': AutoSaveStage,
+    'convert': ConvertStage,
+    'downscale': DownscaleStage,
+    'redact': RedactStage,
+    'phash': PerceptualHashStage,
+    'command': CommandStage,
+}
+
+
+def run_pipeline(image, stages, context):
+    """
+    ステージを順に実行し、各ステージの結果と所要時間を返します。
+    ワーカー（別プロセス）で実行されます。あるステージが失敗しても残りは続行します。
+    """
+    results = []
+    for stage in stages:
+        start = time.perf_counter()
+        try:
+            image, result = stage.run(image, context)
+        except Exception as e:
+            result = {'error': str(e)}
+        result['stage'] = stage.name
+        result['elapsed_ms'] = (time.perf_counter() - start) * 1000
+        results.append(result)
+    return results
+
+
+def load_pipeline_config(path=None):
+    """pipeline.json を読み込みます。存在しない場合は空のdictを返します。"""
+    path = path or os.path.join(get_app_data_dir(), CONFIG_FILE)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Failed to load pipeline config: {e}")
+        return {}
+
+
+def build_stages(stage_configs):
+    """設定のリストからステージを生成します。未知の種類は無視します。"""
+    stages = []
+    for conf in stage_configs:
+        conf = dict(conf)
+        stage_cls = STAGE_TYPES.get(conf.pop('type', None))
+        if stage_cls is None:
+            print(f"Unknown pipeline stage: {conf}")
+            continue
+        stages.append(stage_cls(**conf))
+    return stages
+
+
+class CapturePipeline:
+    """
+    キャプチャ後処理をワーカープールで実行し、結果をメインスレッドのコールバックに返します。
+    同時実行数は max_workers、待ち行列は max_pending 件までに制限され、
+    溢れた場合は最も古い待機中のキャプチャを破棄します（バックプレッシャー）。
+    """
+    def __init__(self, root, stages, executor='process', max_workers=2, max_pending=8):
+        """
+        Args:
+            root (tk.Tk): コールバックをメインスレッドで実行するためのルート。
+            stages (list): 実行する Stage のリスト。
+            executor (str): 'process' または 'thread'。
+            max_workers (int): 同時に実行するキャプチャ数。
+            max_pending (int): 実行待ちにできるキャプチャ数。
+        """
+        self.root = root
+        self.stages = stages
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.lock = threading.Lock()
+        self.pending = deque()
+        self.in_flight = 0
+        self.seq = 0
+        self.dropped = 0
+        self.executor = None
+        if stages:
+            self.executor = self.create_executor(executor)
+
+    @classmethod
+    def from_config(cls, root, config=None):
+        config = load_pipeline_config() if config is None else config
+        return cls(
+            root, build_stages(config.get('stages', [])),
+            executor=config.get('executor', 'process'),
+            max_workers=config.get('max_workers', 2),
+            max_pending=config.get('max_pending', 8),
+        )
+
+    def create_executor(self, kind):
+        if kind == 'process':
+            try:
+                return ProcessPoolExecutor(max_workers=self.max_workers)
+            except (OSError, NotImplementedError) as e:
+                print(f"Process pool unavailable ({e}). Using threads.")
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pipeline")
+
+    @property
+    def enabled(self):
+        return self.executor is not None
+
+    def submit(self, image, callback, origin=(0, 0)):
+        """
+        キャプチャ画像をパイプラインに投入します。すぐに戻ります。
+
+        Args:
+            image (PIL.Image.Image): キャプチャ画像。
+            callback (callable): 結果リストを受け取る関数（メインスレッドで呼ばれる）。
+            origin (tuple): キャプチャ領域の画面上の左上座標。
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            self.seq += 1
+            context = {'seq': self.seq, 'captured_at': time.time(), 'origin': tuple(origin)}
+            self.pending.append((image, context, callback, time.perf_counter()))
+            if len(self.pending) > self.max_pending:
+                self.pending.popleft()
+                self.dropped += 1
+                print(f"Pipeline backlog full; dropped oldest capture ({self.dropped} dropped so far)")
+        self.drain()
+
+    def drain(self):
+        """
+        空きワーカーがある限り、待ち行列からジョブを投入します。
+        メインスレッド（submit）とプールのスレッド（on_done）から同時に呼ばれることがあります。
+        """
+        while True:
+            with self.lock:
+                if self.in_flight >= self.max_workers or not self.pending:
+                    return
+                job = self.pending.popleft()
+                self.in_flight += 1
+            image, context, callback, queued_at = job
+            queued_ms = (time.perf_counter() - queued_at) * 1000
+            try:
+                future = self.submit_job(image, context)
+            except Exception as e:
+                # 投入できなかったジョブの枠を戻し、エラーを結果として返す
+                with self.lock:
+                    self.in_flight -= 1
+                results = [{'stage': 'pipeline', 'error': f"submit failed: {e}"}]
+                summary = {'queued_ms': queued_ms, 'total_ms': 0.0}
+                self.root.after(0, lambda cb=callback, r=results, s=summary: cb(r, s))
+                continue
+            future.add_done_callback(
+                lambda f, cb=callback, q=queued_ms, t=time.perf_counter(): self.on_done(f, cb, q, t)
+            )
+
+    def submit_job(self, image, context):
+        """
+        ワーカーにジョブを投入します。プロセスプールが壊れている場合はスレッドプールに切り替えます。
+        エグゼキューターの置き換えはロック内で行い、同時に切り替えが起きないようにします。
+        """
+        with self.lock:
+            executor = self.executor
+        if executor is None:
+            raise RuntimeError("pipeline is shut down")
+        try:
+            return executor.submit(run_pipeline, image, self.stages, context)
+        except (BrokenProcessPool, RuntimeError) as e:
+            with self.lock:
+                if self.executor is None:
+                    raise RuntimeError("pipeline is shut down")
+                if self.executor is executor:
+                    print(f"Pipeline executor failed ({e}). Falling back to threads.")
+                    self.executor = self.create_executor('thread')
+                executor = self.executor
+            return executor.submit(run_pipeline, image, self.stages, context)
+
+    def on_done(self, future, callback, queued_ms, started_at):
+        """ワーカー完了時（プールのスレッド）に呼ばれます。"""
+        with self.lock:
+            self.in_flight -= 1
+        try:
+            results = future.result()
+        except Exception as e:
+            results = [{'stage': 'pipeline', 'error': str(e)}]
+        summary = {'queued_ms': queued_ms, 'total_ms': (time.perf_counter() - started_at) * 1000}
+        self.root.after(0, lambda: callback(results, summary))
+        self.drain()
+
+    def shutdown(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -2,60 +2,336 @@ import tkinter as tk
 from tkinter import filedialog, ttk
 from PIL import ImageTk, Image, ImageDraw
 import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import win32clipboard
-import win32gui
-import win32con
+from spatial import SpatialIndex, expand, snap_rect, pack_rects
+import export
+from window_pool import PooledWindow, WindowPool
+from ingest import ImageIngestor, hook_drop_files, load_in_background
 
 class SnippetManager:
     """
     アクティブな付箋とグループウィンドウのコレクションを管理します。
     付箋の作成、削除、結合を処理します。
+    ウィンドウの矩形は空間インデックスで管理し、吸着や整列の近傍検索に使用します。
     """
+    SNAP_DISTANCE = 10 # 吸着する距離（ピクセル）
+
     def __init__(self, root):
         self.root = root
-        self.snippets = []
+        self.windows = {} # 作成順のウィンドウ集合（dictを順序付きsetとして使用）
+        self.windows_by_type = {SnippetWindow: {}, GroupWindow: {}}
+        self.index = SpatialIndex()
+        self.screen_rect = (0, 0, root.winfo_screenwidth(), root.winfo_screenheight())
+        # 作成済みの非表示ウィンドウを再利用して付箋の作成を高速化
+        self.snippet_pool = WindowPool(
+            root, SnippetWindow.LABEL_BINDINGS, SnippetWindow.WINDOW_BINDINGS, on_create=self.setup_snippet_shell
+        )
+        self.group_pool = WindowPool(root, with_label=False, size=1, max_size=2)
+        # クリップボード・ファイルからの画像の取り込み
+        self.ingestor = ImageIngestor(self)
+        # 一括操作の再描画用ワーカー（PILのリサイズはGILを解放するためスレッドで並列化できる）
+        self.render_executor = None
+        self.batch_generations = {} # 操作の種類 -> 最新の一括操作の番号
+
+    @property
+    def snippets(self):
+        """全ウィンドウ（付箋とグループ）のリスト。"""
+        return list(self.windows)
 
-    def create_snippet(self, image, x=None, y=None):
-        window = SnippetWindow(self.root, image, self.on_snippet_close, self, x=x, y=y)
-        self.snippets.append(window)
+    def register(self, window):
+        self.windows[window] = None
+        self.windows_by_type[type(window)][window] = None
+        self.update_bounds(window)
+
+    def setup_snippet_shell(self, shell):
+        """プールのウィンドウ作成時に一度だけ、ファイルのドロップを受け付けるよう設定します。"""
+        hook_drop_files(shell.window, lambda paths: shell.dispatch("on_drop_files", paths))
+
+    def create_snippet(self, image, x=None, y=None, full_image_loader=None):
+        """
+        付箋を作成します。
+
+        Args:
+            image (PIL.Image.Image): 表示する画像（縮小プレビューの場合もある）。
+            x (int, optional): 表示X座標。省略時は画面中央。
+            y (int, optional): 表示Y座標。
+            full_image_loader (callable, optional): image が縮小プレビューの場合に、
+                フル解像度の画像を返す関数。
+        """
+        window = SnippetWindow(self.root, image, self.on_snippet_close, self, x=x, y=y,
+                               full_image_loader=full_image_loader)
+        self.register(window)
+        return window
         
     def on_snippet_close(self, snippet):
-        if snippet in self.snippets:
-            self.snippets.remove(snippet)
+        self.windows.pop(snippet, None)
+        self.windows_by_type[type(snippet)].pop(snippet, None)
+        self.index.remove(snippet)
+
+    def update_bounds(self, window):
+        """
+        ウィンドウの現在の矩形を空間インデックスに反映します。
+        非表示のウィンドウは吸着や整列の対象にならないようインデックスから外します。
+        """
+        if window not in self.windows:
+            return
+        if window.hidden:
+            self.index.remove(window)
+        else:
+            self.index.update(window, window.rect)
+
+    def snap_position(self, window, x, y):
+        """
+        ドラッグ中のウィンドウ位置を、近くのウィンドウの辺や画面端に吸着させます。
+        """
+        _, _, w, h = window.rect
+        rect = (x, y, w, h)
+        near = self.index.query(expand(rect, self.SNAP_DISTANCE))
+        near.discard(window)
+        neighbours = [self.index.get(k) for k in near]
+        return snap_rect(rect, neighbours, self.screen_rect, self.SNAP_DISTANCE)
+
+    def arrange_all(self):
+        """表示中のすべてのウィンドウを画面左上から重ならないように詰めて並べます。"""
+        windows = [w for w in self.windows if not w.hidden]
+        if not windows:
+            return
+        margin = 8
+        sizes = [w.rect[2:] for w in windows]
+        positions = pack_rects(sizes, self.screen_rect[2] - margin * 2, origin=(margin, margin), gap=margin)
+        for window, (x, y) in zip(windows, positions):
+            window.set_geometry(x, y)
+
+    def collect_images(self):
+        """全付箋とグループの全タブの画像を作成順に返します。"""
+        images = []
+        for window in self.windows:
+            if isinstance(window, GroupWindow):
+                images.extend(tab['image'] for tab in window.tabs)
+            else:
+                # 縮小プレビューの付箋はフル解像度を書き出しワーカー側で読み込む（失敗時はプレビュー）
+                if window.full_image_loader:
+                    images.append((window.full_image_loader, window.original_image))
+                else:
+                    images.append(window.original_image)
+        return images
+
+    def export_all(self):
+        """全画像をPDF/TIFF/コンタクトシートに書き出します（バックグラウンドで実行）。"""
+        export.ask_and_export(self.root, self.collect_images())
 
     def merge_all_snippets(self):
-        if len(self.snippets) < 2:
+        """
+        すべての付箋と既存のグループを1つのグループウィンドウにまとめます。
+        画像の読み込みと表示画像の生成はワーカーで並列に行い、完了後にまとめて置き換えます。
+        """
+        windows_to_close = self.snippets
+        if len(windows_to_close) < 2:
             return # 結合するものがない
-
-        # グループウィンドウを作成
-        # 実際の付箋のみをフィルタリング（既存のグループウィンドウはオプションだが、今は単純化のためスキップ）
-        # 単純な結合として、すべてのアクティブな付箋画像を取得
-        
-        images_to_merge = []
-        windows_to_close = []
         
-        for s in list(self.snippets):
-            if isinstance(s, SnippetWindow):
-                images_to_merge.append(s.original_image)
-                windows_to_close.append(s)
-            elif isinstance(s, GroupWindow):
-                # 既存のグループを結合したい場合は、画像を取り出す必要がある
-                pass # 複雑さを避けるため今はスキップ
-        
-        if len(images_to_merge) < 2:
+        # グループのタブも展開し、縮小プレビューの付箋はフル解像度を読み込む
+        # (window, 画像または画像を返す関数, 読み込みに失敗したときの画像)
+        sources = []
+        for window in windows_to_close:
+            if isinstance(window, GroupWindow):
+                sources.extend((window, tab['image'], tab['image']) for tab in window.tabs)
+            else:
+                sources.append((window, window.full_image_loader or window.original_image, window.original_image))
+        x, y = windows_to_close[0].rect[:2]
+
+        def render(source, fallback):
+            try:
+                image = source() if callable(source) else source
+            except OSError as e:
+                print(f"Failed to load full resolution image for merge: {e}")
+                image = fallback # プレビューのまま結合する
+            return image, SnippetLogicMixin.generate_framed_image(image, 1.0)
+
+        def finish(results):
+            # 生成中に閉じられたウィンドウ（先に完了した別の結合を含む）は対象外にし、
+            # 生成に失敗した画像を含むウィンドウは閉じずに残す
+            failed = {window for (window, _, _), result in zip(sources, results) if result is None}
+            targets = [w for w in windows_to_close if not w.closed and w in self.windows and w not in failed]
+            if len(targets) < 2:
+                return
+            target_set = set(targets)
+            merged = [result for (window, _, _), result in zip(sources, results) if window in target_set]
+            for s in targets:
+                s.close()
+            images = [image for image, _ in merged]
+            framed = [f for _, f in merged]
+            group_window = GroupWindow(self.root, images, self.on_snippet_close, self, framed_images=framed, x=x, y=y)
+            self.register(group_window)
+            self.root.update_idletasks()
+
+        # 結合は後続の一括操作に置き換えられないよう種類を指定しない
+        self.run_in_background([lambda s=s, f=f: render(s, f) for _, s, f in sources], finish)
+
+    # 一括操作
+    def get_render_executor(self):
+        if self.render_executor is None:
+            self.render_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="render")
+        return self.render_executor
+
+    def run_in_background(self, tasks, callback, kind=None):
+        """
+        タスクをワーカープールで並列に実行し、すべての結果が揃ったら
+        callback(results) をメインスレッドで1回だけ呼び出します。
+        失敗したタスクの結果は None になり、成功したものはそのまま渡されます。
+        kind を指定した場合、同じ種類の新しい一括操作が開始されると古い結果は破棄されます。
+        """
+        generation = None
+        if kind is not None:
+            generation = self.batch_generations.get(kind, 0) + 1
+            self.batch_generations[kind] = generation
+        executor = self.get_render_executor()
+
+        def run(task):
+            try:
+                return task()
+            except Exception as e:
+                print(f"Bulk operation task failed: {e}")
+                return None
+
+        def wait():
+            try:
+                results = list(executor.map(run, tasks))
+            except RuntimeError as e: # 終了処理でワーカーが停止した
+                print(f"Bulk operation failed: {e}")
+                return
+            self.root.after(0, lambda: self.finish_batch(kind, generation, callback, results))
+        threading.Thread(target=wait, daemon=True).start()
+
+    def finish_batch(self, kind, generation, callback, results):
+        if kind is not None and generation != self.batch_generations.get(kind):
+            return # 同じ種類の新しい一括操作に置き換えられた
+        callback(results)
+
+    def run_batch(self, jobs, kind):
+        """
+        (window, render) のリストを実行します。render はワーカーで並列に実行され、
+        結果は1回のコールバックでまとめて window.apply_render に渡されます。
+        """
+        if not jobs:
             return
+        windows = [window for window, _ in jobs]
 
-        for s in windows_to_close:
-            s.close()
-            
-        group_window = GroupWindow(self.root, images_to_merge, self.on_snippet_close, self)
-        self.snippets.append(group_window)
+        def apply(results):
+            for window, result in zip(windows, results):
+                if result is not None and not window.closed:
+                    window.apply_render(result)
+            self.root.update_idletasks() # ジオメトリと画像の変更を1フレームで反映
+
+        self.run_in_background([render for _, render in jobs], apply, kind)
+
+    def scale_all(self, scale):
+        """すべてのウィンドウの表示倍率を変更します。"""
+        jobs = []
+        for window in self.windows:
+            if isinstance(window, SnippetWindow) and window.is_minimized:
+                window.prev_scale = scale # シェーディング解除時にこの倍率で表示
+                continue
+            jobs.append((window, window.render_job(scale)))
+        self.run_batch(jobs, 'scale')
+
+    def set_opacity_all(self, alpha):
+        """すべてのウィンドウの不透明度を変更します（再描画は不要）。"""
+        for window in self.windows:
+            window.set_opacity(alpha)
+
+    def set_hidden_all(self, hidden):
+        """すべてのウィンドウを非表示（または再表示）にします。"""
+        for window in self.windows:
+            window.set_hidden(hidden)
+
+    def hide_all(self):
+        self.set_hidden_all(True)
+
+    def show_all(self):
+        self.set_hidden_all(False)
+
+    def close_all(self):
+        for window in self.snippets:
+            window.close()
+
+    def shade_all(self):
+        """
+        すべての付箋をシェーディングします。すべてシェーディング済みの場合は解除します。
+        """
+        snippets = list(self.windows_by_type[SnippetWindow])
+        unshaded = [s for s in snippets if not s.is_minimized]
+        if unshaded:
+            for s in unshaded:
+                s.shade()
+            return
+        self.run_batch([
+            (s, s.render_job(getattr(s, 'prev_scale', 1.0), unshade=True)) for s in snippets
+        ], 'unshade')
+
+    def create_bulk_menu(self, parent):
+        """「All Snippets」サブメニューを作成します。"""
+        menu = tk.Menu(parent, tearoff=0)
+        scale_menu = tk.Menu(menu, tearoff=0)
+        for sc in [0.5, 0.8, 1.0, 1.2, 1.5, 2.0]:
+            scale_menu.add_command(label=f"{int(sc*100)}%", command=lambda s=sc: self.scale_all(s))
+        menu.add_cascade(label="Scale", menu=scale_menu)
+        opacity_menu = tk.Menu(menu, tearoff=0)
+        for op in [1.0, 0.9, 0.8, 0.7, 0.6, 0.5, 0.4, 0.3, 0.2]:
+            opacity_menu.add_command(label=f"{int(op*100)}%", command=lambda o=op: self.set_opacity_all(o))
+        menu.add_cascade(label="Opacity", menu=opacity_menu)
+        menu.add_command(label="Shade / Unshade All", command=self.shade_all)
+        menu.add_command(label="Hide All", command=self.hide_all)
+        menu.add_command(label="Merge All", command=self.merge_all_snippets)
+        menu.add_separator()
+        menu.add_command(label="Close All", command=self.close_all)
+        return menu
+
+    def shutdown(self):
+        if self.render_executor:
+            self.render_executor.shutdown(wait=False, cancel_futures=True)
+            self.render_executor = None
 
 
 class SnippetLogicMixin:
     """SnippetWindowとGroupWindowで共有されるメソッド"""
     
-    def generate_framed_image(self, img, scale=1.0):
+    def set_geometry(self, x, y, w=None, h=None):
+        """
+        ウィンドウの位置（と大きさ）を変更し、マネージャーの空間インデックスを更新します。
+        w, h を省略した場合は現在の大きさのままです。
+        """
+        x, y = int(x), int(y)
+        if w is None:
+            _, _, w, h = self.rect
+            self.window.geometry(f"+{x}+{y}")
+        else:
+            self.window.geometry(f"{w}x{h}+{x}+{y}")
+        self.rect = (x, y, w, h)
+        if self.manager:
+            self.manager.update_bounds(self)
+
+    def begin_drag(self, event):
+        """ドラッグ開始時のポインタとウィンドウの位置を記録します。"""
+        self.drag_origin = (event.x_root, event.y_root, self.rect[0], self.rect[1])
+
+    def drag_to(self, event):
+        """
+        ドラッグ中の移動を処理します。吸着でウィンドウがずれてもポインタとの相対位置が
+        崩れないよう、開始位置からの差分で吸着前の位置を計算します。Shiftを押している間は吸着しません。
+        """
+        start_x, start_y, win_x, win_y = self.drag_origin
+        x = win_x + event.x_root - start_x
+        y = win_y + event.y_root - start_y
+        if self.manager and not (event.state & 0x0001):
+            x, y = self.manager.snap_position(self, x, y)
+        if (x, y) != self.rect[:2]:
+            self.set_geometry(x, y)
+    
+    @staticmethod
+    def generate_framed_image(img, scale=1.0):
         """
         白い枠線（左/上）と影/暗い枠線（右/下）を追加します。
         これはSetunaの視覚スタイルを模倣しています。
@@ -126,32 +402,35 @@ class SnippetLogicMixin:
         if filename:
             image.save(filename)
 
-    def hide_from_taskbar(self):
-        """
-        ウィンドウにWS_EX_TOOLWINDOWスタイルを適用してタスクバーから隠します。
-        """
-        try:
-            self.window.update_idletasks()
-            hwnd = win32gui.GetParent(self.window.winfo_id())
-            # winfo_id()はラッパーのIDを返すことがあるためGetParentで実際のHWND取得を試みるが、
-            # TkinterのToplevelではwinfo_id()自体がHWNDであることも多い。
-            # ここでは確実性を高めるため、winfo_id() をそのまま使う。
-            # GetParentを使うとデスクトップウィンドウなどが返ってくるリスクがある。
-            hwnd = self.window.winfo_id()
-            
-            style = win32gui.GetWindowLong(hwnd, win32con.GWL_EXSTYLE)
-            style = style | win32con.WS_EX_TOOLWINDOW
-            win32gui.SetWindowLong(hwnd, win32con.GWL_EXSTYLE, style)
-        except Exception as e:
-            print(f"Failed to hide from taskbar: {e}")
-
 
 class SnippetWindow(SnippetLogicMixin):
     """
     単一のフローティング付箋ウィンドウ。
     移動、リサイズ、描画、トリミング、ホットキーをサポートします。
     """
-    def __init__(self, master, image, close_callback, manager=None, x=None, y=None):
+    # イベント -> メソッド名（プールのウィンドウは作成時に一度だけバインドされる）
+    LABEL_BINDINGS = {
+        "<ButtonPress-1>": "start_move",
+        "<ButtonRelease-1>": "stop_move",
+        "<B1-Motion>": "do_move",
+        "<Button-3>": "show_context_menu",
+        "<Double-Button-1>": "toggle_shading",
+        "<MouseWheel>": "on_mouse_wheel",
+        "<Enter>": "on_enter",
+        "<Leave>": "on_leave",
+    }
+    # ホットキー
+    WINDOW_BINDINGS = {
+        "<q>": "close",
+        "<Control-c>": "copy_to_clipboard",
+        "<Control-x>": "cut_image",
+        "<t>": "toggle_trim_mode",
+        "<Control-z>": "undo",
+        "<e>": "toggle_drawing_mode",
+        "<Control-v>": "paste_image",
+    }
+
+    def __init__(self, master, image, close_callback, manager=None, x=None, y=None, full_image_loader=None):
         """
         新しいSnippetWindowを初期化します。
 
@@ -162,13 +441,23 @@ class SnippetWindow(SnippetLogicMixin):
             manager (SnippetManager, optional): この付箋を管理するマネージャー。デフォルトはNone。
             x (int, optional): 初期表示X座標。
             y (int, optional): 初期表示Y座標。
+            full_image_loader (callable, optional): image が縮小プレビューの場合に、
+                フル解像度の画像を返す関数。必要になったときに一度だけ呼び出されます。
         """
         self.manager = manager
         self.original_image = image
-        self.scale = 1.0
+        self.full_image_loader = full_image_loader
+        self.full_resolution_pending = False # フル解像度をバックグラウンドで読み込み中か
+        self.full_resolution_callbacks = [] # 読み込み完了後に実行する処理
+        self.scale = 1.0 # 表示倍率（縮小プレビューの場合はプレビューの大きさが100%）
+        # フル解像度の読み込み後、倍率を画像の画素に対する倍率に換算する係数（プレビュー幅 / フル解像度の幅）
+        self.resolution_scale = 1.0
         self.is_minimized = False # 階調化（シェーディング）モード用
         self.opacity = 1.0
         self.close_callback = close_callback
+        self.pipeline_results = None # キャプチャ後処理の結果（完了時に設定される）
+        self.closed = False
+        self.hidden = False
         
         # 状態フラグ
         self.drawing_mode = False
@@ -176,46 +465,31 @@ class SnippetWindow(SnippetLogicMixin):
         self.last_draw_y = None
         
         # 表示用の視覚効果を適用
-        self.current_display_image = self.generate_framed_image(self.original_image, self.scale)
+        self.current_display_image = self.generate_framed_image(self.original_image, self.display_scale)
         self.tk_image = ImageTk.PhotoImage(self.current_display_image)
         
-        self.window = tk.Toplevel(master)
-        self.window.overrideredirect(True) # フレームレスウィンドウ
-        self.hide_from_taskbar()
-        self.window.attributes('-topmost', True) # 常に最前面
+        # スタイル設定・イベントバインド済みのウィンドウを取得
+        if manager:
+            self.shell = manager.snippet_pool.acquire(self)
+        else:
+            self.shell = PooledWindow(master, self.LABEL_BINDINGS, self.WINDOW_BINDINGS)
+            self.shell.owner = self
+        self.window = self.shell.window
+        self.label = self.shell.label
+        self.label.config(image=self.tk_image)
+        self.menu = None
         
         w, h = self.current_display_image.size
         
         if x is not None and y is not None:
-             self.window.geometry(f"{w}x{h}+{int(x)}+{int(y)}")
+             self.set_geometry(x, y, w, h)
         else:
             # 初期位置を中央に
             screen_width = master.winfo_screenwidth()
             screen_height = master.winfo_screenheight()
             pos_x = (screen_width - w) // 2
             pos_y = (screen_height - h) // 2
-            self.window.geometry(f"{w}x{h}+{int(pos_x)}+{int(pos_y)}")
-
-        self.label = tk.Label(self.window, image=self.tk_image, bd=0)
-        self.label.pack(fill=tk.BOTH, expand=True)
-
-        # イベントバインド
-        self.label.bind("<ButtonPress-1>", self.start_move)
-        self.label.bind("<ButtonRelease-1>", self.stop_move)
-        self.label.bind("<B1-Motion>", self.do_move)
-        self.label.bind("<Button-3>", self.show_context_menu)
-        self.label.bind("<Double-Button-1>", self.toggle_shading)
-        self.label.bind("<MouseWheel>", self.on_mouse_wheel)
-        self.label.bind("<Enter>", self.on_enter)
-        self.label.bind("<Leave>", self.on_leave)
-        
-        # ホットキー
-        self.window.bind("<q>", lambda e: self.close())
-        self.window.bind("<Control-c>", lambda e: self.copy_image_to_clipboard(self.original_image))
-        self.window.bind("<Control-x>", self.cut_image)
-        self.window.bind("<t>", self.toggle_trim_mode)
-        self.window.bind("<Control-z>", self.undo)
-        self.window.bind("<e>", lambda event: self.toggle_drawing_mode())
+            self.set_geometry(pos_x, pos_y, w, h)
         
         # 描画状態
         self.drawing_mode = False
@@ -234,8 +508,101 @@ class SnippetWindow(SnippetLogicMixin):
         self.history = [] # アンドゥ用スタック
         self.x = None
         self.y = None
+        # コンテキストメニューは右クリック時に生成する
         
-        self.create_context_menu()
+        self.window.deiconify()
+
+    def request_full_resolution(self, callback=None):
+        """
+        縮小プレビューを表示している場合、フル解像度の画像と表示画像をワーカーで生成し、
+        完了後にメインスレッドで置き換えます。callback は置き換え後に呼ばれます
+        （プレビューでない場合はすぐに呼ばれます）。
+        """
+        if self.full_image_loader is None:
+            if callback:
+                callback()
+            return
+        if callback:
+            self.full_resolution_callbacks.append(callback)
+        if self.full_resolution_pending:
+            return
+        self.full_resolution_pending = True
+        loader = self.full_image_loader
+        preview_width = self.original_image.width
+        scale = self.scale
+
+        def load():
+            full = loader()
+            return full, scale, self.generate_framed_image(full, scale * preview_width / full.width)
+        load_in_background(self.window, load, lambda result: self.on_full_resolution_loaded(loader, result))
+
+    def on_full_resolution_loaded(self, loader, result):
+        if self.closed or self.full_image_loader is not loader:
+            return # 閉じられたか、既に別の経路で置き換えられた
+        if result is None:
+            self.finish_full_resolution(None)
+            return
+        full, scale, framed = result
+        # 読み込み中に倍率が変わっていなければ、ワーカーで生成した表示画像をそのまま使う
+        self.finish_full_resolution(full, framed if scale == self.scale else None)
+
+    def ensure_full_resolution(self):
+        """
+        フル解像度の画像をこの場で読み込みます。クリップボードへのコピーや保存など、
+        結果がすぐに必要な場合にのみ使い、読み込み中はビジーカーソルを表示します。
+        """
+        loader = self.full_image_loader
+        if loader is None:
+            return
+        self.label.config(cursor="watch")
+        self.window.update_idletasks()
+        try:
+            full = loader()
+        except OSError as e:
+            print(f"Failed to load full resolution image: {e}")
+            full = None
+        finally:
+            self.label.config(cursor="cross" if self.drawing_mode or self.trim_mode else "arrow")
+        self.finish_full_resolution(full)
+
+    @property
+    def display_scale(self):
+        """original_image の画素に対する実際の表示倍率。"""
+        return self.scale * self.resolution_scale
+
+    def adopt_full_resolution(self, full):
+        """
+        フル解像度の画像に置き換えます（再描画はしません）。
+        倍率はプレビュー基準のまま変えず、表示サイズが変わらないよう換算係数を設定します。
+        """
+        self.resolution_scale = self.resolution_scale * self.original_image.width / full.width
+        self.original_image = full
+        self.full_image_loader = None
+        self.history = [] # プレビュー基準の履歴は使えない
+
+    def finish_full_resolution(self, full, framed=None):
+        """
+        フル解像度の読み込み結果を反映し、待機中の処理を実行します。
+        読み込みに失敗した場合（full が None）はプレビューのまま使い続けます。
+        """
+        if full is not None:
+            self.adopt_full_resolution(full)
+            if framed is not None:
+                self.show_display_image(framed)
+            else:
+                self.update_display()
+            if not self.is_minimized:
+                new_w, new_h = self.current_display_image.size
+                self.set_geometry(self.rect[0], self.rect[1], new_w, new_h)
+        else:
+            self.full_image_loader = None # 再試行しない
+        self.run_full_resolution_callbacks()
+
+    def run_full_resolution_callbacks(self):
+        self.full_resolution_pending = False
+        callbacks, self.full_resolution_callbacks = self.full_resolution_callbacks, []
+        for callback in callbacks:
+            callback()
 
     def undo(self, event=None):
         if not self.history:
@@ -251,7 +618,8 @@ class SnippetWindow(SnippetLogicMixin):
         # メモリ問題を避けるため履歴サイズを制限 (例: 20)
         if len(self.history) > 20:
             self.history.pop(0)
-        self.history.append(self.original_image.copy())
+        # 編集は常に新しい画像に対して行う（コピーオンライト）ため、現在の画像をそのまま保存できる
+        self.history.append(self.original_image)
 
     def on_enter(self, event):
         self.is_hovering = True
@@ -272,7 +640,26 @@ class SnippetWindow(SnippetLogicMixin):
         else:
             self.window.attributes('-alpha', self.opacity)
 
+    def copy_to_clipboard(self, event=None):
+        self.ensure_full_resolution()
+        self.copy_image_to_clipboard(self.original_image)
+
+    def save_to_file(self):
+        self.ensure_full_resolution()
+        self.save_image_to_file(self.original_image)
+
+    def paste_image(self, event=None):
+        """クリップボードの画像を新しい付箋として取り込みます。"""
+        if self.manager:
+            self.manager.ingestor.ingest_clipboard()
+
+    def on_drop_files(self, paths):
+        """この付箋にドロップされたファイルを、少しずらした位置に付箋として取り込みます。"""
+        if self.manager:
+            self.manager.ingestor.ingest_files(paths, self.rect[0] + 24, self.rect[1] + 24)
+
     def cut_image(self, event=None):
+        self.ensure_full_resolution()
         self.copy_image_to_clipboard(self.original_image)
         self.close()
 
@@ -284,6 +671,7 @@ class SnippetWindow(SnippetLogicMixin):
         else:
             self.x = event.x
             self.y = event.y
+            self.begin_drag(event)
             self.update_opacity()
 
     def stop_move(self, event):
@@ -304,30 +692,33 @@ class SnippetWindow(SnippetLogicMixin):
             self.do_trim(event)
         else:
             if self.x is None or self.y is None: return
-            # 差分を計算してウィンドウを移動
-            deltax = event.x - self.x
-            deltay = event.y - self.y
-            x = self.window.winfo_x() + deltax
-            y = self.window.winfo_y() + deltay
-            self.window.geometry(f"+{x}+{y}")
+            # 開始位置からの差分でウィンドウを移動（近くの辺に吸着）
+            self.drag_to(event)
             
     # 描画メソッド
     def start_draw(self, event):
+        if self.full_image_loader is not None:
+            # プレビューへの描き込みは失われるため、フル解像度の読み込みが終わるまで描画しない
+            self.request_full_resolution()
+            print("Loading full resolution image...")
+            return
         self.save_state() # ストローク前に保存
+        # ワーカー（書き出し・一括再描画）に渡した画像を書き換えないよう、コピーに描画する
+        self.original_image = self.original_image.copy()
         # ストローク座標を画像の縮尺に合わせて変換
-        self.last_draw_x = (event.x - 1) / self.scale
-        self.last_draw_y = (event.y - 1) / self.scale
+        self.last_draw_x = (event.x - 1) / self.display_scale
+        self.last_draw_y = (event.y - 1) / self.display_scale
 
     def do_draw(self, event):
         if self.last_draw_x is None: return
         
-        curr_x = (event.x - 1) / self.scale
-        curr_y = (event.y - 1) / self.scale
+        curr_x = (event.x - 1) / self.display_scale
+        curr_y = (event.y - 1) / self.display_scale
         
         # 元画像に描画（永続的）
         draw = ImageDraw.Draw(self.original_image)
         # 縮尺に基づいて線の太さを調整 -> 縮小表示時に見やすくするため太くする
-        width = int(3/self.scale) if self.scale < 1 else 3
+        width = int(3/self.display_scale) if self.display_scale < 1 else 3
         draw.line([self.last_draw_x, self.last_draw_y, curr_x, curr_y], fill='red', width=width)
         
         self.last_draw_x = curr_x
@@ -343,6 +734,7 @@ class SnippetWindow(SnippetLogicMixin):
         self.trim_mode = not self.trim_mode
         self.drawing_mode = False # 排他制御
         if self.trim_mode:
+            self.request_full_resolution() # 切り取りまでに読み込んでおく
             self.label.config(cursor="cross")
             print("Trim mode ON")
         else:
@@ -388,22 +780,31 @@ class SnippetWindow(SnippetLogicMixin):
         if x2 - x1 < 5 or y2 - y1 < 5:
             self.update_display() 
             return
-            
-        # 表示座標を元画像の座標に変換するロジック:
+        
+        # 表示座標を画像に対する割合に変換する:
         # 1. 枠線のオフセット(1px)を削除
         # 2. 倍率で割る
-        
-        orig_x1 = int((x1 - 1) / self.scale)
-        orig_y1 = int((y1 - 1) / self.scale)
-        orig_x2 = int((x2 - 1) / self.scale)
-        orig_y2 = int((y2 - 1) / self.scale)
-        
-        # 画像の範囲内に座標を収める
+        # 割合にしておくことで、フル解像度の読み込み後も同じ領域を指す
         w, h = self.original_image.size
-        orig_x1 = max(0, min(orig_x1, w))
-        orig_y1 = max(0, min(orig_y1, h))
-        orig_x2 = max(0, min(orig_x2, w))
-        orig_y2 = max(0, min(orig_y2, h))
+        box = (
+            (x1 - 1) / self.display_scale / w,
+            (y1 - 1) / self.display_scale / h,
+            (x2 - 1) / self.display_scale / w,
+            (y2 - 1) / self.display_scale / h,
+        )
+        # 縮小プレビューの場合はフル解像度の読み込み後に切り取る
+        self.request_full_resolution(lambda: self.apply_trim(box))
+            
+        self.trim_start_x = None
+        self.toggle_trim_mode() # トリミングモードを自動終了
+
+    def apply_trim(self, box):
+        """画像に対する割合で指定された領域を切り取ります。"""
+        w, h = self.original_image.size
+        # 画像の範囲内に座標を収める
+        orig_x1, orig_y1, orig_x2, orig_y2 = (
+            max(0, min(int(v * size), size)) for v, size in zip(box, (w, h, w, h))
+        )
         
         # 有効な領域が存在することを確認
         if orig_x2 - orig_x1 > 0 and orig_y2 - orig_y1 > 0:
@@ -415,13 +816,13 @@ class SnippetWindow(SnippetLogicMixin):
             self.update_display()
             # 新しい画像サイズに合わせてウィンドウをリサイズ
             new_w, new_h = self.current_display_image.size
-            self.window.geometry(f"{new_w}x{new_h}")
-            
-        self.trim_start_x = None
-        self.toggle_trim_mode() # トリミングモードを自動終了
+            self.set_geometry(self.rect[0], self.rect[1], new_w, new_h)
 
     def update_display(self):
-        self.current_display_image = self.generate_framed_image(self.original_image, self.scale)
+        self.show_display_image(self.generate_framed_image(self.original_image, self.display_scale))
+
+    def show_display_image(self, framed):
+        self.current_display_image = framed
         self.tk_image = ImageTk.PhotoImage(self.current_display_image)
         self.label.config(image=self.tk_image)
 
@@ -435,16 +836,23 @@ class SnippetWindow(SnippetLogicMixin):
         self.set_scale(new_scale)
 
     def create_context_menu(self):
-        self.menu = tk.Menu(self.window, tearoff=0)
+        if self.menu is not None:
+            self.menu.destroy()
+        self.menu = self.shell.track(tk.Menu(self.window, tearoff=0))
         self.menu.add_command(label="Toggle Pen Mode (E)", command=self.toggle_drawing_mode)
         self.menu.add_command(label="Trim Mode (T)", command=self.toggle_trim_mode)
-        # 管理機能で結合が可能かチェック
-        if self.manager and len([s for s in self.manager.snippets if isinstance(s, SnippetWindow)]) > 1:
+        # 管理機能で結合が可能かチェック（既存のグループも結合対象）
+        if self.manager and len(self.manager.windows) > 1:
             self.menu.add_command(label="Merge All Snippets", command=self.manager.merge_all_snippets)
+            self.menu.add_command(label="Arrange All", command=self.manager.arrange_all)
             
         self.menu.add_separator()
-        self.menu.add_command(label="Copy (Ctrl+C)", command=lambda: self.copy_image_to_clipboard(self.original_image))
-        self.menu.add_command(label="Save As...", command=lambda: self.save_image_to_file(self.original_image))
+        self.menu.add_command(label="Copy (Ctrl+C)", command=self.copy_to_clipboard)
+        self.menu.add_command(label="Save As...", command=self.save_to_file)
+        if self.manager:
+            self.menu.add_command(label="Export All...", command=self.manager.export_all)
+            self.menu.add_command(label="Paste Image (Ctrl+V)", command=self.paste_image)
+            self.menu.add_command(label="Open Image...", command=self.manager.ingestor.open_dialog)
         
         opacity_menu = tk.Menu(self.menu, tearoff=0)
         for op in [1.0, 0.9, 0.8, 0.7, 0.6, 0.5, 0.4, 0.3, 0.2]:
@@ -455,14 +863,17 @@ class SnippetWindow(SnippetLogicMixin):
         for sc in [0.5, 0.8, 1.0, 1.2, 1.5, 2.0]:
              scale_menu.add_command(label=f"{int(sc*100)}%", command=lambda s=sc: self.set_scale(s))
         self.menu.add_cascade(label="Scale", menu=scale_menu)
+        if self.manager:
+            self.menu.add_cascade(label="All Snippets", menu=self.manager.create_bulk_menu(self.menu))
         
         self.menu.add_separator()
         self.menu.add_command(label="Close (Q)", command=self.close)
 
-    def toggle_drawing_mode(self):
+    def toggle_drawing_mode(self, event=None):
         self.drawing_mode = not self.drawing_mode
         self.trim_mode = False
         if self.drawing_mode:
+            self.request_full_resolution() # 描き始めるまでに読み込んでおく
             self.label.config(cursor="cross")
         else:
             self.label.config(cursor="arrow")
@@ -478,13 +889,15 @@ class SnippetWindow(SnippetLogicMixin):
             self.set_scale(self.prev_scale if hasattr(self, 'prev_scale') else 1.0)
             self.is_minimized = False
         else:
-            self.prev_scale = self.scale
-            self.is_minimized = True
-            curr_w = self.window.winfo_width()
-            curr_x = self.window.winfo_x()
-            curr_y = self.window.winfo_y()
-            self.window.geometry(f"{curr_w}x30+{curr_x}+{curr_y}") 
-            self.label.config(anchor='n') 
+            self.shade()
+
+    def shade(self):
+        """ウィンドウを細いバー状に最小化します（再描画は不要）。"""
+        self.prev_scale = self.scale
+        self.is_minimized = True
+        curr_x, curr_y, curr_w, _ = self.rect
+        self.set_geometry(curr_x, curr_y, curr_w, 30)
+        self.label.config(anchor='n') 
             
     def set_opacity(self, alpha):
         self.opacity = alpha
@@ -494,12 +907,70 @@ class SnippetWindow(SnippetLogicMixin):
         self.scale = scale
         self.update_display()
         new_w, new_h = self.current_display_image.size
-        x = self.window.winfo_x()
-        y = self.window.winfo_y()
-        self.window.geometry(f"{new_w}x{new_h}+{x}+{y}")
+        self.set_geometry(self.rect[0], self.rect[1], new_w, new_h)
+        if self.full_image_loader is not None and scale > 1.0:
+            # プレビューの解像度を超えて拡大する場合のみ、フル解像度をバックグラウンドで読み込む
+            # （届くまではプレビューを拡大して表示し、届いたら同じ表示サイズで置き換える）
+            self.request_full_resolution()
 
-    def close(self):
-        self.window.destroy()
+    def render_job(self, scale, unshade=False):
+        """
+        指定倍率の表示画像をワーカースレッドで生成する関数を返します（一括操作用）。
+        必要な状態はここ（メインスレッド）で取り出し、関数自体はウィンドウやTkに触れません。
+        結果は apply_render に渡します。
+        """
+        image = self.original_image
+        resolution_scale = self.resolution_scale
+        loader = self.full_image_loader if scale > 1.0 else None
+
+        def render():
+            full = None
+            factor = resolution_scale
+            if loader is not None:
+                # プレビューの解像度を超える場合はフル解像度を読み込む（失敗した場合はプレビューを拡大する）
+                try:
+                    full = loader()
+                    factor = image.width / full.width
+                except OSError as e:
+                    print(f"Failed to load full resolution image: {e}")
+            return scale, full, self.generate_framed_image(full or image, scale * factor), unshade, image
+        return render
+
+    def apply_render(self, result):
+        """render_job の結果をメインスレッドで反映します。"""
+        scale, full, framed, unshade, image = result
+        if unshade:
+            self.label.config(anchor='center')
+            self.is_minimized = False
+        if self.original_image is not image:
+            # 生成中に画像が変わった（編集やフル解像度の読み込み）ため、生成済みの表示画像は使わず現在の画像で描き直す
+            self.set_scale(scale)
+            return
+        if full is not None and self.full_image_loader is not None:
+            self.adopt_full_resolution(full)
+            self.run_full_resolution_callbacks() # 個別に要求されていた読み込みの待機処理
+        self.scale = scale
+        self.show_display_image(framed)
+        new_w, new_h = framed.size
+        self.set_geometry(self.rect[0], self.rect[1], new_w, new_h)
+
+    def set_hidden(self, hidden):
+        self.hidden = hidden
+        if hidden:
+            self.window.withdraw()
+        else:
+            self.window.deiconify()
+        if self.manager:
+            self.manager.update_bounds(self)
+
+    def close(self, event=None):
+        if self.closed:
+            return # 同じウィンドウをプールに二重に返さない
+        self.closed = True
+        if self.manager:
+            self.manager.snippet_pool.release(self.shell) # ウィンドウは破棄せず再利用
+        else:
+            self.shell.destroy()
         if self.close_callback:
             self.close_callback(self)
 
@@ -509,19 +980,38 @@ class GroupWindow(SnippetLogicMixin):
     複数の画像をタブ（ttk.Notebook）に設定するウィンドウ。
     SnippetWindowと似ていますが、複数画像を扱います。
     """
-    def __init__(self, master, images, close_callback, manager=None):
+    def __init__(self, master, images, close_callback, manager=None, framed_images=None, x=0, y=0):
+        """
+        Args:
+            master: 親のTkinterウィンドウ。
+            images (list): タブに表示するPIL画像のリスト。
+            close_callback (callable): ウィンドウが閉じられたときに呼び出す関数。
+            manager (SnippetManager, optional): このウィンドウを管理するマネージャー。
+            framed_images (list, optional): 生成済みの表示画像（倍率1.0）。一括結合時にワーカーで生成したもの。
+            x (int): 初期表示X座標。
+            y (int): 初期表示Y座標。
+        """
         self.master = master
         self.manager = manager
         self.images = images
         self.close_callback = close_callback
         self.scale = 1.0
+        self.opacity = 1.0
+        self.x = None
+        self.y = None
+        self.rect = (int(x), int(y), 1, 1)
+        self.curr_menu = None
+        self.closed = False
+        self.hidden = False
         
-        self.window = tk.Toplevel(master)
-        self.window.overrideredirect(True) 
-        self.hide_from_taskbar()
-        self.window.attributes('-topmost', True)
+        if manager:
+            self.shell = manager.group_pool.acquire(self)
+        else:
+            self.shell = PooledWindow(master, with_label=False)
+            self.shell.owner = self
+        self.window = self.shell.window
         
-        self.notebook = ttk.Notebook(self.window)
+        self.notebook = self.shell.track(ttk.Notebook(self.window))
         self.notebook.pack(fill=tk.BOTH, expand=True)
         self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
         
@@ -533,7 +1023,7 @@ class GroupWindow(SnippetLogicMixin):
             self.notebook.add(frame, text=f"Img {i+1}")
             
             # ラベル
-            framed_img = self.generate_framed_image(img, self.scale)
+            framed_img = framed_images[i] if framed_images else self.generate_framed_image(img, self.scale)
             tk_img = ImageTk.PhotoImage(framed_img)
             self.tk_images.append(tk_img)
             
@@ -545,15 +1035,19 @@ class GroupWindow(SnippetLogicMixin):
             label.bind("<ButtonRelease-1>", self.stop_move)
             label.bind("<B1-Motion>", self.do_move)
             label.bind("<Button-3>", self.show_context_menu)
+            label.bind("<MouseWheel>", self.on_mouse_wheel)
             
             self.tabs.append({
                 'frame': frame,
                 'label': label,
-                'image': img
+                'image': img,
+                'scale': self.scale, # 表示画像を生成したときの倍率
+                'size': framed_img.size
             })
             
         # 最初の画像に基づいて初期サイズを設定
         self.update_geometry()
+        self.window.deiconify()
         
     def on_tab_changed(self, event):
         """タブ切り替え時にウィンドウサイズを更新します。"""
@@ -566,53 +1060,127 @@ class GroupWindow(SnippetLogicMixin):
             current_tab = self.notebook.select()
             if not current_tab: return 
             idx = self.notebook.index(current_tab)
-            original_img = self.tabs[idx]['image']
+            tab = self.tabs[idx]
             
-            framed = self.generate_framed_image(original_img, self.scale)
-            tk_img = ImageTk.PhotoImage(framed)
-            self.tk_images[idx] = tk_img # 参照を更新
-            self.tabs[idx]['label'].configure(image=tk_img)
+            # 倍率が変わったタブのみ再生成する
+            if tab['scale'] != self.scale:
+                self.show_tab_image(idx, self.generate_framed_image(tab['image'], self.scale), self.scale)
             
-            w, h = framed.size
+            w, h = tab['size']
             h += 25 # タブバーの高さ（概算）
             
-            curr_x = self.window.winfo_x()
-            curr_y = self.window.winfo_y()
+            curr_x, curr_y, _, _ = self.rect
             
-            self.window.geometry(f"{w}x{h}+{curr_x}+{curr_y}")
+            self.set_geometry(curr_x, curr_y, w, h)
         except Exception as e:
             print(f"Error updating geometry: {e}")
         
+    def show_tab_image(self, idx, framed, scale):
+        tk_img = ImageTk.PhotoImage(framed)
+        self.tk_images[idx] = tk_img # 参照を更新
+        tab = self.tabs[idx]
+        tab['label'].configure(image=tk_img)
+        tab['scale'] = scale
+        tab['size'] = framed.size
+
+    def set_scale(self, scale):
+        """表示倍率を変更します。表示中のタブのみ再生成し、他のタブは切り替え時に生成します。"""
+        self.scale = scale
+        self.update_geometry()
+
+    def on_mouse_wheel(self, event):
+        new_scale = self.scale + (0.1 if event.delta > 0 else -0.1)
+        self.set_scale(min(3.0, max(0.1, new_scale)))
+
+    def render_job(self, scale):
+        """
+        表示中のタブの表示画像をワーカースレッドで生成する関数を返します（一括操作用）。
+        結果は apply_render に渡します。
+        """
+        idx = self.notebook.index(self.notebook.select())
+        image = self.tabs[idx]['image']
+        return lambda: (scale, idx, self.generate_framed_image(image, scale))
+
+    def apply_render(self, result):
+        """render_job の結果をメインスレッドで反映します。"""
+        scale, idx, framed = result
+        self.scale = scale
+        self.show_tab_image(idx, framed, scale)
+        self.update_geometry()
+
+    def set_opacity(self, alpha):
+        self.opacity = alpha
+        self.window.attributes('-alpha', alpha)
+
+    def set_hidden(self, hidden):
+        self.hidden = hidden
+        if hidden:
+            self.window.withdraw()
+        else:
+            self.window.deiconify()
+        if self.manager:
+            self.manager.update_bounds(self)
+
     def start_move(self, event):
         self.x = event.x
         self.y = event.y
+        self.begin_drag(event)
 
     def stop_move(self, event):
         self.x = None
         self.y = None
 
     def do_move(self, event):
-        deltax = event.x - self.x
-        deltay = event.y - self.y
-        x = self.window.winfo_x() + deltax
-        y = self.window.winfo_y() + deltay
-        self.window.geometry(f"+{x}+{y}")
+        if self.x is None or self.y is None: return
+        self.drag_to(event)
         
     def create_context_menu(self):
-        self.curr_menu = tk.Menu(self.window, tearoff=0)
+        if self.curr_menu is not None:
+            self.curr_menu.destroy()
+        self.curr_menu = self.shell.track(tk.Menu(self.window, tearoff=0))
         idx = self.notebook.index(self.notebook.select())
         img = self.tabs[idx]['image']
         
         self.curr_menu.add_command(label="Copy", command=lambda: self.copy_image_to_clipboard(img))
         self.curr_menu.add_command(label="Save", command=lambda: self.save_image_to_file(img))
+        self.curr_menu.add_command(label="Export All Tabs...", command=self.export_all)
+        if self.manager:
+            self.curr_menu.add_command(label="Export All...", command=self.manager.export_all)
+        if self.manager and len(self.manager.windows) > 1:
+            self.curr_menu.add_command(label="Arrange All", command=self.manager.arrange_all)
+        
+        opacity_menu = tk.Menu(self.curr_menu, tearoff=0)
+        for op in [1.0, 0.9, 0.8, 0.7, 0.6, 0.5, 0.4, 0.3, 0.2]:
+            opacity_menu.add_command(label=f"{int(op*100)}%", command=lambda o=op: self.set_opacity(o))
+        self.curr_menu.add_cascade(label="Opacity", menu=opacity_menu)
+        
+        scale_menu = tk.Menu(self.curr_menu, tearoff=0)
+        for sc in [0.5, 0.8, 1.0, 1.2, 1.5, 2.0]:
+            scale_menu.add_command(label=f"{int(sc*100)}%", command=lambda s=sc: self.set_scale(s))
+        self.curr_menu.add_cascade(label="Scale", menu=scale_menu)
+        if self.manager:
+            self.curr_menu.add_cascade(label="All Snippets", menu=self.manager.create_bulk_menu(self.curr_menu))
+        
         self.curr_menu.add_separator()
         self.curr_menu.add_command(label="Close Group", command=self.close)
 
+    def export_all(self):
+        """全タブの画像をPDF/TIFF/コンタクトシートに書き出します（バックグラウンドで実行）。"""
+        # 書き出し中にグループが閉じられても進捗ウィンドウが残るよう、ルートを親にする
+        master = self.manager.root if self.manager else self.master
+        export.ask_and_export(master, [tab['image'] for tab in self.tabs])
+
     def show_context_menu(self, event):
         self.create_context_menu()
         self.curr_menu.post(event.x_root, event.y_root)
 
     def close(self):
-        self.window.destroy()
+        if self.closed:
+            return
+        self.closed = True
+        if self.manager:
+            self.manager.group_pool.release(self.shell) # 登録したタブはリセット時に破棄される
+        else:
+            self.shell.destroy()
         if self.close_callback:
             self.close_callback(self)
@@ -0,0 +1,148 @@
+"""
+付箋ウィンドウの矩形を扱う空間インデックスと配置計算。
+矩形はすべて (x, y, w, h) のタプルで表します。
+"""
+
+class SpatialIndex:
+    """
+    一様グリッドによる空間インデックス。
+    各キーの矩形を重なるセルに登録し、近傍検索をセル単位で行います。
+    """
+    def __init__(self, cell_size=256):
+        """
+        Args:
+            cell_size (int): セルの一辺のピクセル数。
+        """
+        self.cell_size = cell_size
+        self.cells = {} # (cx, cy) -> set(key)
+        self.rects = {} # key -> rect
+
+    def cells_for(self, rect):
+        x, y, w, h = rect
+        size = self.cell_size
+        for cx in range(int(x) // size, int(x + max(w, 1) - 1) // size + 1):
+            for cy in range(int(y) // size, int(y + max(h, 1) - 1) // size + 1):
+                yield cx, cy
+
+    def insert(self, key, rect):
+        """キーの矩形を登録します（既に登録されている場合は更新）。"""
+        old = self.rects.get(key)
+        if old == rect:
+            return
+        if old is not None:
+            self.remove(key)
+        self.rects[key] = rect
+        for cell in self.cells_for(rect):
+            self.cells.setdefault(cell, set()).add(key)
+
+    update = insert
+
+    def remove(self, key):
+        rect = self.rects.pop(key, None)
+        if rect is None:
+            return
+        for cell in self.cells_for(rect):
+            bucket = self.cells.get(cell)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self.cells[cell]
+
+    def get(self, key):
+        return self.rects.get(key)
+
+    def query(self, rect):
+        """矩形と重なる（または接する）キーの集合を返します。"""
+        x, y, w, h = rect
+        found = set()
+        for cell in self.cells_for(rect):
+            found.update(self.cells.get(cell, ()))
+        return {k for k in found if intersects(self.rects[k], (x, y, w, h))}
+
+    def __len__(self):
+        return len(self.rects)
+
+
+def intersects(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    return ax <= bx + bw and bx <= ax + aw and ay <= by + bh and by <= ay + ah
+
+
+def expand(rect, margin):
+    x, y, w, h = rect
+    return (x - margin, y - margin, w + margin * 2, h + margin * 2)
+
+
+def snap_rect(rect, neighbours, bounds=None, threshold=10):
+    """
+    矩形の位置を近くの矩形の辺・画面端に吸着させます。
+
+    Args:
+        rect: 移動中の矩形。
+        neighbours: 吸着対象の矩形のリスト。
+        bounds: 画面の矩形（内側の辺に吸着）。Noneなら使用しない。
+        threshold (int): 吸着する距離（ピクセル）。
+
+    Returns:
+        吸着後の (x, y)。
+    """
+    x, y, w, h = rect
+    best_dx = best_dy = None
+
+    def consider(current, delta):
+        if abs(delta) <= threshold and (current is None or abs(delta) < abs(current)):
+            return delta
+        return current
+
+    for nx, ny, nw, nh in neighbours:
+        # 縦方向に重なっている場合のみ左右の辺に吸着（斜めの位置で吸い寄せられないように）
+        if y <= ny + nh + threshold and ny <= y + h + threshold:
+            for target in (nx, nx + nw): # 隣接（相手の右に自分の左など）と整列の両方
+                best_dx = consider(best_dx, target - x)
+                best_dx = consider(best_dx, target - (x + w))
+        if x <= nx + nw + threshold and nx <= x + w + threshold:
+            for target in (ny, ny + nh):
+                best_dy = consider(best_dy, target - y)
+                best_dy = consider(best_dy, target - (y + h))
+
+    if bounds is not None:
+        bx, by, bw, bh = bounds
+        best_dx = consider(best_dx, bx - x)
+        best_dx = consider(best_dx, bx + bw - (x + w))
+        best_dy = consider(best_dy, by - y)
+        best_dy = consider(best_dy, by + bh - (y + h))
+
+    return x + (best_dx or 0), y + (best_dy or 0)
+
+
+def pack_rects(sizes, width, origin=(0, 0), gap=8):
+    """
+    シェルフ（棚）方式で矩形を詰めて配置します。
+    高さの大きい順に左から並べ、幅を超えたら次の段に移ります。
+
+    Args:
+        sizes: (w, h) のリスト。
+        width (int): 配置できる幅。
+        origin: 配置領域の左上座標。
+        gap (int): 矩形間の間隔。
+
+    Returns:
+        sizes と同じ順序の (x, y) のリスト。
+    """
+    ox, oy = origin
+    positions = [None] * len(sizes)
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0]))
+    cursor_x = ox
+    shelf_y = oy
+    shelf_h = 0
+    for i in order:
+        w, h = sizes[i]
+        if cursor_x > ox and cursor_x + w > ox + width:
+            shelf_y += shelf_h + gap
+            cursor_x = ox
+            shelf_h = 0
+        positions[i] = (cursor_x, shelf_y)
+        cursor_x += w + gap
+        shelf_h = max(shelf_h, h)
+    return positions
@@ -1,4 +1,5 @@
 import tkinter as tk
+import os
 
 """
 ウィンドウ管理および画面プロパティに関するユーティリティ関数。
@@ -25,3 +26,35 @@ def center_window(window, width, height):
     y = (screen_height / 2) - (height / 2)
     
     window.geometry(f'{width}x{height}+{int(x)}+{int(y)}')
+
+def get_app_data_dir():
+    """
+    アプリケーションのデータ保存ディレクトリを取得します（存在しない場合は作成）。
+    Windowsでは %APPDATA%\\SetunaClone、それ以外ではホームディレクトリ配下を使用します。
+    """
+    base = os.environ.get('APPDATA') or os.path.expanduser('~')
+    name = 'SetunaClone' if os.environ.get('APPDATA') else '.setuna_clone'
+    path = os.path.join(base, name)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def apply_toolwindow_style(window):
+    """
+    ウィンドウにWS_EX_TOOLWINDOWスタイルを適用してタスクバーから隠します。
+    pywin32はここでのみ使うため、履歴・IPC・パイプラインのワーカーが読み込まずに済むよう関数内でインポートします。
+    """
+    try:
+        import win32gui
+        import win32con
+        window.update_idletasks()
+        # winfo_id()はラッパーのIDを返すことがあるためGetParentで実際のHWND取得を試みるが、
+        # TkinterのToplevelではwinfo_id()自体がHWNDであることも多い。
+        # ここでは確実性を高めるため、winfo_id() をそのまま使う。
+        # GetParentを使うとデスクトップウィンドウなどが返ってくるリスクがある。
+        hwnd = window.winfo_id()
+        
+        style = win32gui.GetWindowLong(hwnd, win32con.GWL_EXSTYLE)
+        style = style | win32con.WS_EX_TOOLWINDOW
+        win32gui.SetWindowLong(hwnd, win32con.GWL_EXSTYLE, style)
+    except Exception as e:
+        print(f"Failed to hide from taskbar: {e}")
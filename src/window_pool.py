@@ -0,0 +1,144 @@
+"""
+付箋ウィンドウ用のToplevelプール。
+フレームレス化・タスクバー非表示・最前面化・イベントバインドを済ませた非表示のウィンドウを
+あらかじめ用意しておき、付箋の作成時に再利用することで作成の遅延を減らします。
+"""
+import tkinter as tk
+from utils import apply_toolwindow_style
+
+
+class PooledWindow:
+    """
+    プールで管理される、スタイル設定とイベントバインドが済んだToplevel。
+    イベントは現在の所有者（owner）の同名メソッドに転送されます。
+    """
+    def __init__(self, master, label_bindings=None, window_bindings=None, with_label=True):
+        """
+        Args:
+            master: 親となるTkinterウィジェット。
+            label_bindings (dict): ラベルのイベント名 -> 所有者のメソッド名。
+            window_bindings (dict): ウィンドウのイベント名 -> 所有者のメソッド名。
+            with_label (bool): 画像表示用のラベルを作成するか。
+        """
+        self.owner = None
+        self.widgets = [] # 所有者が作成した子ウィジェット（返却時に破棄）
+        self.window = tk.Toplevel(master)
+        self.window.withdraw() # 使われるまで非表示
+        self.window.overrideredirect(True) # フレームレスウィンドウ
+        apply_toolwindow_style(self.window)
+        self.window.attributes('-topmost', True) # 常に最前面
+
+        self.label = None
+        if with_label:
+            self.label = tk.Label(self.window, bd=0)
+            self.label.pack(fill=tk.BOTH, expand=True)
+            for sequence, name in (label_bindings or {}).items():
+                self.label.bind(sequence, lambda e, n=name: self.dispatch(n, e))
+        for sequence, name in (window_bindings or {}).items():
+            self.window.bind(sequence, lambda e, n=name: self.dispatch(n, e))
+
+    def dispatch(self, name, event):
+        if self.owner is not None:
+            return getattr(self.owner, name)(event)
+
+    def track(self, widget):
+        """
+        所有者が作成した子ウィジェット（コンテキストメニューやグループのタブなど）を登録します。
+        登録したものだけが返却時に破棄されます。
+        """
+        self.widgets.append(widget)
+        return widget
+
+    def reset(self):
+        """再利用に備えて状態を初期化し、非表示にします。"""
+        self.owner = None
+        self.window.withdraw()
+        self.window.attributes('-alpha', 1.0)
+        for widget in self.widgets:
+            if widget.winfo_exists():
+                widget.destroy()
+        self.widgets = []
+        if self.label is not None:
+            self.label.config(image='', cursor='arrow', anchor='center')
+
+    def destroy(self):
+        self.owner = None
+        self.window.destroy()
+
+
+class WindowPool:
+    """
+    PooledWindow のプール。アイドル時に目標数まで補充します。
+    """
+    def __init__(self, master, label_bindings=None, window_bindings=None, with_label=True, size=3, max_size=8, on_create=None):
+        """
+        Args:
+            master: 親となるTkinterウィジェット。
+            label_bindings (dict): PooledWindow に渡すラベルのバインド。
+            window_bindings (dict): PooledWindow に渡すウィンドウのバインド。
+            with_label (bool): ラベル付きのウィンドウを作成するか。
+            size (int): アイドル時に補充する目標数。
+            max_size (int): 返却されたウィンドウを保持する最大数（超えた分は破棄）。
+            on_create (callable, optional): 新しいウィンドウの作成時に PooledWindow を受け取る関数。
+        """
+        self.master = master
+        self.label_bindings = label_bindings
+        self.window_bindings = window_bindings
+        self.with_label = with_label
+        self.size = size
+        self.max_size = max_size
+        self.on_create = on_create
+        self.idle = []
+        self.hits = 0
+        self.misses = 0
+        self.refill_scheduled = False
+        self.schedule_refill()
+
+    def create(self):
+        shell = PooledWindow(self.master, self.label_bindings, self.window_bindings, self.with_label)
+        if self.on_create:
+            self.on_create(shell)
+        return shell
+
+    def acquire(self, owner):
+        """
+        ウィンドウを取り出して所有者を設定します（プールが空の場合は新規作成）。
+        ウィンドウは非表示のままなので、位置と内容を設定してから deiconify してください。
+        """
+        if self.idle:
+            shell = self.idle.pop()
+            self.hits += 1
+        else:
+            shell = self.create()
+            self.misses += 1
+        shell.owner = owner
+        self.schedule_refill()
+        return shell
+
+    def release(self, shell):
+        """ウィンドウを初期化してプールに戻します。"""
+        if len(self.idle) >= self.max_size:
+            shell.destroy()
+            return
+        shell.reset()
+        self.idle.append(shell)
+
+    def schedule_refill(self):
+        if not self.refill_scheduled and len(self.idle) < self.size:
+            self.refill_scheduled = True
+            self.master.after_idle(self.refill)
+
+    def refill(self):
+        """アイドル時に1つずつ作成し、目標数に達するまで再スケジュールします。"""
+        self.refill_scheduled = False
+        if len(self.idle) < self.size:
+            self.idle.append(self.create())
+        self.schedule_refill()
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def report(self):
+        return f"hit rate {self.hit_rate:.0%} ({self.hits}/{self.hits + self.misses}), {len(self.idle)} idle"
@@ -1,4 +1,4 @@
 @echo off
 cd /d "%~dp0"
-start "" ".venv\Scripts\pythonw.exe" src\main.py
+start "" ".venv\Scripts\pythonw.exe" src\main.py %*
 exit